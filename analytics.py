@@ -0,0 +1,183 @@
+"""喝水历史的统计分析：滑动平均、连续达标天数、达标率和分时段分布
+
+数据以 array 列保存(见 DrinkHistory)。安装了 numpy 时各项统计直接在这些列的缓冲区上做整列运算，不复制数据；
+没有 numpy 时(打包的程序默认不带)退回逐元素的纯Python循环，结果相同。
+10年约3.6万条事件时 summarize 用 numpy 约 7ms，纯Python循环约 20~35ms(benchmarks/bench_analytics.py)。
+"""
+import time
+import datetime
+from array import array
+from itertools import accumulate
+
+from core import EventBuffer
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# 不计入分时段统计的事件来源：从旧版按天数据导入的记录没有真实的时间
+UNTIMED_SOURCES = ('migrated',)
+
+
+class DrinkHistory:
+    """列式存储的喝水历史
+
+    按天汇总的两列(日期序数、当天总量)和逐条事件的两列(时间戳、水量，即 EventBuffer 的两列)都用 array 保存，
+    每条只占几个字节，统计时整列计算而不是逐个构造 datetime。
+    """
+
+    __slots__ = ('day_ordinals', 'day_totals', 'event_times', 'event_amounts')
+
+    def __init__(self, day_ordinals=None, day_totals=None, event_times=None, event_amounts=None):
+        self.day_ordinals = day_ordinals if day_ordinals is not None else array('l')
+        self.day_totals = day_totals if day_totals is not None else array('l')
+        self.event_times = event_times if event_times is not None else array('d')
+        self.event_amounts = event_amounts if event_amounts is not None else array('i')
+
+    @classmethod
+    def from_store(cls, store):
+        """从喝水记录存储加载全部历史"""
+        items = sorted(store.days().items())
+        day_ordinals = array('l', [datetime.date.fromisoformat(day).toordinal() for day, _ in items])
+        day_totals = array('l', [ml for _, ml in items])
+        # 逐条事件直接写入定长记录，不保留每条事件的元组
+        events = EventBuffer()
+        for ts, _, ml, source in store.iter_events():
+            if source not in UNTIMED_SOURCES:
+                events.append(ts, ml)
+        return cls(day_ordinals, day_totals, events.times, events.amounts)
+
+    def daily_series(self, first_ordinal, last_ordinal):
+        """[first, last] 每天一个值的稠密序列，没有记录的日期为0"""
+        series = array('l', bytes(array('l').itemsize * (last_ordinal - first_ordinal + 1)))
+        if numpy is not None:
+            ordinals, totals = _column(self.day_ordinals), _column(self.day_totals)
+            selected = (ordinals >= first_ordinal) & (ordinals <= last_ordinal)
+            _column(series)[ordinals[selected] - first_ordinal] = totals[selected]
+            return series
+        for ordinal, total in zip(self.day_ordinals, self.day_totals):
+            if first_ordinal <= ordinal <= last_ordinal:
+                series[ordinal - first_ordinal] = total
+        return series
+
+
+def _column(values):
+    """array 列的 numpy 视图，与原 array 共用内存"""
+    return numpy.frombuffer(values, dtype=values.typecode)
+
+
+def rolling_average(series, window):
+    """按前缀和计算每天的滑动平均，窗口不足时按已有天数平均"""
+    if numpy is not None:
+        prefix = numpy.concatenate(([0], numpy.cumsum(_column(series), dtype=numpy.int64)))
+        days = numpy.arange(1, len(prefix))
+        averages = (prefix[1:] - prefix[numpy.maximum(days - window, 0)]) / numpy.minimum(days, window)
+        return array('d', averages.tobytes())
+    prefix = array('q', accumulate(series, initial=0))
+    return array('d', [(prefix[i] - prefix[max(i - window, 0)]) / min(i, window)
+                       for i in range(1, len(prefix))])
+
+
+def streaks(series, goal):
+    """返回 (当前连续达标天数, 最长连续达标天数)
+
+    当天尚未达标时不中断当前连续天数，从昨天开始往前计算。
+    """
+    if numpy is not None:
+        return _streaks_numpy(_column(series) >= goal)
+    longest = run = 0
+    for total in series:
+        run = run + 1 if total >= goal else 0
+        longest = max(longest, run)
+    if series and series[-1] < goal:
+        current = 0
+        for total in reversed(series[:-1]):
+            if total < goal:
+                break
+            current += 1
+    else:
+        current = run
+    return current, longest
+
+
+def _streaks_numpy(hits):
+    if not hits.size:
+        return 0, 0
+    # 连续达标区间的起止位置：前后补上未达标后，差分为 1 处开始、为 -1 处结束
+    edges = numpy.diff(numpy.concatenate(([0], hits.view(numpy.int8), [0])))
+    starts, ends = numpy.flatnonzero(edges == 1), numpy.flatnonzero(edges == -1)
+    longest = int((ends - starts).max()) if starts.size else 0
+    counted = hits if hits[-1] else hits[:-1]
+    misses = numpy.flatnonzero(~counted)
+    current = len(counted) - (int(misses[-1]) + 1 if misses.size else 0)
+    return current, longest
+
+
+def goal_hit_rate(series, goal):
+    """达标天数占比"""
+    if not series:
+        return 0.0
+    if numpy is not None:
+        return int(numpy.count_nonzero(_column(series) >= goal)) / len(series)
+    return sum(1 for total in series if total >= goal) / len(series)
+
+
+def hourly_histogram(event_times, event_amounts):
+    """按本地时间的小时统计喝水量(只计正数事件，清空和撤销不计入)"""
+    if numpy is not None:
+        return _hourly_histogram_numpy(_column(event_times), _column(event_amounts))
+    histogram = [0] * 24
+    # 事件按时间排序，本地时区偏移只在换天时重新查询一次，兼容夏令时
+    last_day = None
+    offset = 0
+    localtime = time.localtime
+    for ts, ml in zip(event_times, event_amounts):
+        if ml <= 0:
+            continue
+        day = ts // 86400
+        if day != last_day:
+            last_day = day
+            offset = localtime(ts).tm_gmtoff
+        histogram[int((ts + offset) // 3600 % 24)] += ml
+    return histogram
+
+
+def _hourly_histogram_numpy(times, amounts):
+    drinks = amounts > 0
+    times, amounts = times[drinks], amounts[drinks]
+    if not times.size:
+        return [0] * 24
+    # 与循环版本相同，每个UTC日取当天第一条事件所在时刻的本地时区偏移
+    _, first, inverse = numpy.unique(times // 86400, return_index=True, return_inverse=True)
+    offsets = numpy.array([time.localtime(ts).tm_gmtoff for ts in times[first].tolist()], dtype=numpy.float64)
+    hours = ((times + offsets[inverse]) // 3600 % 24).astype(numpy.intp)
+    histogram = numpy.bincount(hours, weights=amounts, minlength=24)
+    return [int(ml) for ml in histogram]
+
+
+def summarize(history, goal, today=None):
+    """计算统计界面需要的全部指标"""
+    started = time.perf_counter()
+    today = today or datetime.date.today()
+    last = today.toordinal()
+    first = min(history.day_ordinals[0], last) if history.day_ordinals else last
+    series = history.daily_series(first, last)
+
+    avg_7 = rolling_average(series, 7)
+    avg_30 = rolling_average(series, 30)
+    current_streak, longest_streak = streaks(series, goal)
+    return {
+        'days': len(series),
+        'total': sum(series),
+        'avg_7': avg_7[-1],
+        'avg_30': avg_30[-1],
+        'rolling_7': list(avg_7[-30:]),
+        'current_streak': current_streak,
+        'longest_streak': longest_streak,
+        'hit_rate_30': goal_hit_rate(series[-30:], goal),
+        'hit_rate_all': goal_hit_rate(series, goal),
+        'hourly': hourly_histogram(history.event_times, history.event_amounts),
+        'events': len(history.event_times),
+        'elapsed_ms': (time.perf_counter() - started) * 1000,
+    }
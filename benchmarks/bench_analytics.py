@@ -0,0 +1,86 @@
+"""统计分析耗时：10年逐条事件数据
+
+用法: python benchmarks/bench_analytics.py
+生成10年、每天8~12次喝水的事件列，分别测量 summarize 的计算耗时和从事件日志加载的耗时。
+安装了 numpy 时同时测量纯Python循环的版本，并检查两者的结果相同。
+"""
+import os
+import sys
+import time
+import random
+import datetime
+import tempfile
+from array import array
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analytics
+from analytics import DrinkHistory, summarize
+from history_store import EventLogHistoryStore
+
+YEARS = 10
+GOAL = 2000
+
+
+def make_events(years=YEARS, seed=1):
+    rng = random.Random(seed)
+    end = datetime.date.today()
+    start = end - datetime.timedelta(days=365 * years)
+    events = []
+    day = start
+    while day <= end:
+        midnight = datetime.datetime.combine(day, datetime.time()).timestamp()
+        for _ in range(rng.randint(8, 12)):
+            events.append((300 if rng.random() < 0.8 else 200, 'bench', midnight + rng.uniform(7, 23) * 3600, str(day)))
+        day += datetime.timedelta(days=1)
+    return events
+
+
+def build_history(events):
+    totals = {}
+    for ml, _, _, day in events:
+        totals[day] = totals.get(day, 0) + ml
+    items = sorted(totals.items())
+    return DrinkHistory(array('l', [datetime.date.fromisoformat(day).toordinal() for day, _ in items]),
+                        array('l', [ml for _, ml in items]),
+                        array('d', [event[2] for event in events]),
+                        array('l', [event[0] for event in events]))
+
+
+def time_summarize(history, runs=10):
+    summarize(history, GOAL)
+    start = time.perf_counter()
+    for _ in range(runs):
+        stats = summarize(history, GOAL)
+    stats.pop('elapsed_ms')
+    return stats, (time.perf_counter() - start) * 1000 / runs
+
+
+def main():
+    events = make_events()
+    history = build_history(events)
+    paths = [('numpy', analytics.numpy), ('纯Python', None)] if analytics.numpy is not None else [('纯Python', None)]
+    results = []
+    for name, module in paths:
+        analytics.numpy = module
+        stats, compute_ms = time_summarize(history)
+        results.append(stats)
+        print(f'{len(events)} 条事件 / {stats["days"]} 天: summarize({name}) 平均 {compute_ms:.1f} ms')
+    analytics.numpy = paths[0][1]
+    assert all(stats == results[0] for stats in results), 'numpy 与纯Python的统计结果不同'
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = EventLogHistoryStore(directory)
+        for i in range(0, len(events), 1000):
+            store.append_many(events[i:i + 1000])
+        store.flush()
+        start = time.perf_counter()
+        loaded = DrinkHistory.from_store(store)
+        load_ms = (time.perf_counter() - start) * 1000
+        store.close()
+    assert len(loaded.event_times) == len(events)
+    print(f'从事件日志加载到列式结构: {load_ms:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""喝水记录批量导出/导入的耗时、文件大小和内存占用
+
+用法: python benchmarks/bench_history_io.py [--events 1000000]
+在SQLite存储中生成 --events 条事件(每天100条)，分别导出为CSV和列式格式，
+再导入到空的存储中，最后把同一个文件重新导入一次(全部应作为重复跳过)。
+导出时的内存峰值用 tracemalloc 单独测量一次，只与天数有关，与事件总数无关。
+"""
+import os
+import sys
+import time
+import argparse
+import datetime
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history_store import SqliteHistoryStore
+from history_io import export_history, import_history
+
+
+def populate(store, events):
+    start = datetime.datetime(2000, 1, 1, 8).timestamp()
+    batch = []
+    for i in range(events):
+        ts = start + i // 100 * 86400 + i % 100 * 360
+        batch.append((150 + i % 7 * 50, 'button', ts, datetime.date.fromtimestamp(ts).isoformat()))
+        if len(batch) == 100000:
+            store.append_many(batch)
+            batch = []
+    if batch:
+        store.append_many(batch)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--events', type=int, default=1000000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = SqliteHistoryStore(os.path.join(directory, 'source.db'))
+        populate(source, args.events)
+        print(f'{args.events} 条事件')
+        for ext in ('csv', 'wcol'):
+            path = os.path.join(directory, 'export.' + ext)
+            count, elapsed = timed(export_history, source, path)
+            tracemalloc.start()
+            export_history(source, path)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f'导出 {ext:<5} {elapsed:7.2f} s  {os.path.getsize(path) / 1048576:7.1f} MB  '
+                  f'内存峰值 {peak / 1048576:.1f} MB')
+
+            target = SqliteHistoryStore(os.path.join(directory, f'target-{ext}.db'))
+            result, elapsed = timed(import_history, target, path)
+            print(f'导入 {ext:<5} {elapsed:7.2f} s  新增 {result["imported"]}')
+            result, elapsed = timed(import_history, target, path)
+            print(f'重复导入    {elapsed:7.2f} s  跳过 {result["skipped"]}')
+            target.close()
+        source.close()
+
+
+if __name__ == '__main__':
+    main()
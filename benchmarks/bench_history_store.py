@@ -0,0 +1,130 @@
+"""喝水记录保存开销对比：旧版整文件重写 vs 追加写事件日志
+
+用法: python benchmarks/bench_history_store.py
+分别在1天和3000天的历史上测量单次保存的平均耗时，
+并比较各存储后端在3000天历史上查询"最近90天"的耗时。
+开始前检查事件日志中日期不按序号递增时，重启后恢复的当天事件和撤销结果是否正确。
+"""
+import os
+import sys
+import json
+import time
+import datetime
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history_store import EventLogHistoryStore, LEGACY_HISTORY_NAME, read_json_history, open_history_store, HISTORY_BACKENDS
+from core import WaterCore
+
+SAVES = 200
+
+
+def make_history(days):
+    start = datetime.date(2020, 1, 1)
+    return {str(start + datetime.timedelta(days=i)): 1500 for i in range(days)}
+
+
+def legacy_save(history_path, today, today_drunk):
+    """旧版 save_drinking_history 的实现：读取、解析并重写整个文件"""
+    data = {}
+    if os.path.exists(history_path):
+        with open(history_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    data[str(today)] = today_drunk
+    with open(history_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def bench_legacy(days):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, LEGACY_HISTORY_NAME)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(make_history(days), f)
+        today = datetime.date.today()
+        start = time.perf_counter()
+        for i in range(SAVES):
+            legacy_save(path, today, i * 300)
+        return (time.perf_counter() - start) / SAVES
+
+
+def bench_event_log(days):
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, LEGACY_HISTORY_NAME), 'w', encoding='utf-8') as f:
+            json.dump(make_history(days), f)
+        store = EventLogHistoryStore(directory)
+        start = time.perf_counter()
+        for _ in range(SAVES):
+            store.append(300, 'bench')
+        elapsed = (time.perf_counter() - start) / SAVES
+        store.close()
+        return elapsed
+
+
+def check_restart_out_of_order():
+    """日志轮转后写入一条更早日期的事件(同步或导入)，重启后仍能恢复当天全部事件，撤销的是最近的几次喝水"""
+    today = datetime.date(2000, 1, 2)
+    noon = datetime.datetime(2000, 1, 2, 12).timestamp()
+    with tempfile.TemporaryDirectory() as directory:
+        store = EventLogHistoryStore(directory, compact_threshold=3)
+        for i, ml in enumerate((100, 200, 300)):
+            store.append(ml, ts=noon + i)
+        store.append_many([(250, 'import', noon - 86400, '2000-01-01')])
+        store.append(150, ts=noon + 3)
+        store.close()
+
+        store = EventLogHistoryStore(directory)
+        events = store.day_events(today)
+        store.close()
+    assert [ml for _, ml, _ in events] == [100, 200, 300, 150], events
+    core = WaterCore(today=today)
+    core.restore_events(today, events)
+    assert core.undo(2, today) == [-150, -300]
+
+
+def legacy_range(history_path, start, end):
+    """旧版只能读取整个文件后再筛选"""
+    data = read_json_history(history_path)
+    return {day: ml for day, ml in data.items() if start <= day <= end}
+
+
+def bench_range(backend, days, queries=50):
+    with tempfile.TemporaryDirectory() as directory:
+        history_path = os.path.join(directory, LEGACY_HISTORY_NAME)
+        history = make_history(days)
+        with open(history_path, 'w', encoding='utf-8') as f:
+            json.dump(history, f)
+        end = max(history)
+        start = str(datetime.date.fromisoformat(end) - datetime.timedelta(days=89))
+        if backend == 'legacy':
+            query = lambda: legacy_range(history_path, start, end)
+            store = None
+        else:
+            store = open_history_store(directory, backend)
+            query = lambda: store.range_totals(start, end)
+        assert len(query()) == 90
+        begin = time.perf_counter()
+        for _ in range(queries):
+            query()
+        elapsed = (time.perf_counter() - begin) / queries
+        if store is not None:
+            store.close()
+        return elapsed
+
+
+def main():
+    check_restart_out_of_order()
+    print(f'{"历史天数":>8} {"整文件重写(us)":>16} {"事件日志(us)":>14}')
+    for days in (1, 3000):
+        legacy = bench_legacy(days) * 1e6
+        event_log = bench_event_log(days) * 1e6
+        print(f'{days:>8} {legacy:>16.1f} {event_log:>14.1f}')
+
+    print()
+    print(f'{"后端":>8} {"最近90天查询(us)":>18}')
+    for backend in ('legacy',) + HISTORY_BACKENDS:
+        print(f'{backend:>8} {bench_range(backend, 3000) * 1e6:>18.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""常驻内存：只有托盘 / 显示主窗口 / 关闭(释放)主窗口之后的RSS
+
+用法: python benchmarks/bench_resident_memory.py [--cycles 20]
+使用Qt的 offscreen 平台。关闭主窗口后收回的内存应不少于窗口本身占用(不含首次打开的一次性开销)的 TARGET_RECLAIM，
+反复打开关闭多次后内存不应持续增长(每次增长不超过 MAX_GROWTH_PER_CYCLE)，否则返回 1。
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PySide6.QtWidgets import QApplication
+from PySide6.QtCore import QEvent
+
+import tray_app
+from platform_support import current_rss, trim_memory
+
+# 关闭窗口后至少收回窗口占用内存的比例
+TARGET_RECLAIM = 0.5
+# 每次打开关闭允许的内存增长(字节)
+MAX_GROWTH_PER_CYCLE = 64 * 1024
+
+
+def settle(app, seconds=0.2):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+
+
+def close_window(app, tray):
+    tray.last_release_rss = None
+    # offscreen 下没有托盘图标，关闭窗口会直接退出，这里走与有托盘时关闭窗口相同的释放路径
+    tray.release_window()
+    while tray.last_release_rss is None:
+        # 不在 app.exec() 中时 processEvents 不会执行 deleteLater，需要手动处理
+        app.sendPostedEvents(None, QEvent.DeferredDelete)
+        app.processEvents()
+        time.sleep(0.005)
+    return tray.last_release_rss[1]
+
+
+def open_window(app, tray):
+    tray.show_window()
+    tray.show_stats()
+    tray.io.flush()
+    settle(app)
+    return current_rss()
+
+
+def mb(value):
+    return f'{value / 1048576:8.1f}MB'
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cycles', type=int, default=20)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv[:1])
+    app.setQuitOnLastWindowClosed(False)
+    with tempfile.TemporaryDirectory() as directory:
+        tray_app.APP_DIR = directory
+        tray = tray_app.WaterReminderTray()
+        tray.start()
+        tray.io.flush()
+        settle(app)
+        trim_memory()
+        tray_only = current_rss()
+
+        open_window(app, tray)
+        # 第一次创建时还包含模块导入、字体和插件加载等一次性开销，这部分无法收回，单独统计；
+        # 用第二次打开的数据衡量窗口本身
+        first_released = close_window(app, tray)
+        shown = open_window(app, tray)
+        released = close_window(app, tray)
+        cycle_start = released
+        for _ in range(args.cycles):
+            open_window(app, tray)
+            released = close_window(app, tray)
+        tray.shutdown()
+
+    one_time = first_released - tray_only
+    window_cost = shown - first_released
+    reclaimed = shown - released
+    growth = (released - cycle_start) / args.cycles
+    print(f'只有托盘:   {mb(tray_only)}')
+    print(f'首次打开后: {mb(first_released)}  (一次性开销 {one_time / 1048576:.1f}MB)')
+    print(f'显示主窗口: {mb(shown)}  (窗口占用 {window_cost / 1048576:.1f}MB)')
+    print(f'释放窗口后: {mb(released)}  (收回 {reclaimed / 1048576:.1f}MB, '
+          f'{reclaimed / window_cost if window_cost > 0 else 0:.0%}, 目标 {TARGET_RECLAIM:.0%})')
+    print(f'{args.cycles} 次打开关闭后每次增长: {growth / 1024:.1f}KB')
+
+    ok = window_cost <= 0 or reclaimed >= window_cost * TARGET_RECLAIM
+    ok = ok and growth <= MAX_GROWTH_PER_CYCLE
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
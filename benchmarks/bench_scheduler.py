@@ -0,0 +1,76 @@
+"""用模拟时钟运行一个月的提醒调度
+
+用法: python benchmarks/bench_scheduler.py
+模拟30天、间隔30分钟、免打扰22:00-08:00的提醒，期间包含稍后提醒、一次白天8小时的系统休眠、
+一次跨过免打扰时段的休眠(21:10休眠，次日06:30唤醒)和一次把系统时间调早1小时，检查触发次数与时间点并输出耗时。
+"""
+import os
+import sys
+import time
+import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scheduler import ReminderScheduler, parse_quiet_hours, SNOOZE
+
+
+class FakeClock:
+    """可手动推进的墙上时钟和单调时钟；休眠时只推进墙上时钟"""
+
+    def __init__(self, start):
+        self.wall = start
+        self.mono = 1000.0
+
+    def time(self):
+        return self.wall
+
+    def monotonic(self):
+        return self.mono
+
+    def advance(self, seconds):
+        self.wall += seconds
+        self.mono += seconds
+
+
+def simulate(days=30):
+    start = datetime.datetime(2025, 8, 1, 7, 0).timestamp()
+    clock = FakeClock(start)
+    scheduler = ReminderScheduler(clock=clock.time, monotonic=clock.monotonic)
+    scheduler.add('water', 30, parse_quiet_hours(['22:00', '08:00']))
+
+    fired = []
+    end = start + days * 86400
+    # (休眠开始时间, 休眠秒数)：第10天 12:00-20:00，第15天 21:10 到次日 06:30
+    suspends = [(start + 10 * 86400 + 3600 * 5, 8 * 3600),
+                (start + 15 * 86400 + 3600 * 14 + 600, 9 * 3600 + 1200)]
+    clock_back_at = start + 20 * 86400 + 3600 * 3  # 第20天 10:00
+    while clock.wall < end:
+        # 与托盘中的定时器一样，最多休眠 MAX_SLEEP_SECONDS
+        clock.advance(max(scheduler.seconds_until_next(), 1))
+        if suspends and clock.wall >= suspends[0][0]:
+            clock.wall += suspends.pop(0)[1]
+        if clock_back_at is not None and clock.wall >= clock_back_at:
+            clock.wall -= 3600
+            clock_back_at = None
+        for key, reason in scheduler.pop_due():
+            fired.append((clock.wall, reason))
+            # 每天第一次提醒时点"稍后提醒"
+            if reason != SNOOZE and datetime.datetime.fromtimestamp(clock.wall).strftime('%H:%M') == '08:00':
+                scheduler.snooze(key, 10)
+    return fired
+
+
+def main():
+    begin = time.perf_counter()
+    fired = simulate()
+    elapsed = time.perf_counter() - begin
+
+    quiet = [ts for ts, _ in fired if not 8 <= datetime.datetime.fromtimestamp(ts).hour < 22]
+    snoozes = sum(1 for _, reason in fired if reason == SNOOZE)
+    assert not quiet, f'免打扰时段内触发了提醒: {quiet[:3]}'
+    assert snoozes == 30, snoozes
+    print(f'模拟30天共触发 {len(fired)} 次提醒(其中稍后提醒 {snoozes} 次)，耗时 {elapsed * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
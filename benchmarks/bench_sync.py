@@ -0,0 +1,139 @@
+"""多设备同步的开销：首次全量同步和之后每次增量同步的耗时
+
+用法: python benchmarks/bench_sync.py [--sizes 1000 100000] [--new 10] [--rounds 20]
+对每种存储后端和每个历史长度，设备A先有 size 条事件并与设备B完成首次同步，
+之后每轮A记录 --new 条新事件，A发布、B拉取，取各轮耗时的中位数。共享文件夹用临时目录代替。
+增量同步的耗时应与历史长度无关：最长历史的耗时超过最短历史的 MAX_RATIO 倍时返回 1。
+每次运行后还检查导入另一台设备的导出文件再同步时，同一条记录不会被重复计算，
+以及事件日志中日期不按序号递增时按天读取和去重仍然完整。
+"""
+import os
+import sys
+import time
+import argparse
+import datetime
+import statistics
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history_io import export_history, import_history
+from history_store import EventLogHistoryStore, SqliteHistoryStore
+from sync import SyncFolder
+
+MAX_RATIO = 3.0
+
+
+def open_store(backend, directory, name):
+    if backend == 'sqlite':
+        return SqliteHistoryStore(os.path.join(directory, name + '.db'))
+    return EventLogHistoryStore(os.path.join(directory, name))
+
+
+def make_events(start, count, ts):
+    events = []
+    for i in range(start, start + count):
+        day = (datetime.date(2000, 1, 1) + datetime.timedelta(days=i // 10)).isoformat()
+        events.append((150 + i % 7 * 50, 'button', ts + i, day))
+    return events
+
+
+def run(backend, size, new, rounds):
+    with tempfile.TemporaryDirectory() as directory:
+        shared = os.path.join(directory, 'shared')
+        os.makedirs(shared)
+        a, b = open_store(backend, directory, 'a'), open_store(backend, directory, 'b')
+        folder_a, folder_b = SyncFolder(shared, 'device-a'), SyncFolder(shared, 'device-b')
+        base = datetime.datetime(2000, 1, 1, 8).timestamp()
+        for start in range(0, size, 100000):
+            a.append_many(make_events(start, min(100000, size - start), base))
+        a.flush()
+
+        started = time.perf_counter()
+        folder_a.sync(a)
+        folder_b.sync(b)
+        initial = time.perf_counter() - started
+
+        samples = []
+        for i in range(rounds):
+            a.append_many(make_events(size + i * new, new, base))
+            started = time.perf_counter()
+            pushed = folder_a.sync(a)['pushed']
+            pulled = folder_b.sync(b)['pulled']
+            samples.append(time.perf_counter() - started)
+            assert pushed == pulled == new
+        assert a.days() == b.days()
+        a.close()
+        b.close()
+        check_import(backend, directory)
+    return initial, statistics.median(samples)
+
+
+def check_out_of_order_days():
+    """日志轮转后合并一条前一天的同步事件，之后按天读取仍能读到轮转出去的当天事件，去重用的键不会缺失"""
+    with tempfile.TemporaryDirectory() as directory:
+        store = EventLogHistoryStore(directory, compact_threshold=3)
+        try:
+            _check_out_of_order_days(store)
+        finally:
+            store.close()
+
+
+def _check_out_of_order_days(store):
+    now = datetime.datetime(2000, 1, 2, 12).timestamp()
+    today, yesterday = '2000-01-02', '2000-01-01'
+    for i in range(3):
+        store.append(200, ts=now + i)
+    store.append_remote('devB', [(1, now - 86400, yesterday, 250, 'button')])
+    store.append(150, ts=now + 3)
+    assert store.day_total(today) == 750
+    assert sum(ml for _, ml, _ in store.day_events(today)) == 750, store.day_events(today)
+    # 其他设备发布的本机已有事件的副本不再计入总量
+    assert store.append_remote('devC', [(1, now, today, 200, 'button')]) == {}
+    assert store.day_total(today) == 750
+
+
+def check_import(backend, directory):
+    """B导入A的导出文件后再同步，导入的副本与A的原始记录只计算一次，第三台设备C也得到相同的总量"""
+    shared = os.path.join(directory, 'shared-import')
+    os.makedirs(shared)
+    stores = {name: open_store(backend, directory, 'import-' + name) for name in 'abc'}
+    folders = {name: SyncFolder(shared, 'device-' + name) for name in 'abc'}
+    ts = datetime.datetime(2000, 1, 1, 8).timestamp()
+    stores['a'].append_many([(300, 'button', ts, None), (200, 'button', ts + 60, None)])
+    stores['b'].append_many([(250, 'button', ts + 30, None)])
+    path = os.path.join(directory, 'a.csv')
+    export_history(stores['a'], path)
+    import_history(stores['b'], path)
+    for name in 'abca':
+        folders[name].sync(stores[name])
+    expected = {'2000-01-01': 750}
+    for name, store in stores.items():
+        assert store.days() == expected, (backend, name, store.days())
+        store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000])
+    parser.add_argument('--new', type=int, default=10)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    check_out_of_order_days()
+    ok = True
+    for backend in ('eventlog', 'sqlite'):
+        results = []
+        for size in args.sizes:
+            initial, incremental = run(backend, size, args.new, args.rounds)
+            results.append(incremental)
+            print(f'{backend:<8} 历史 {size:>8} 条  首次同步 {initial * 1000:9.1f} ms  '
+                  f'增量同步 {args.new} 条 {incremental * 1000:7.2f} ms')
+        ratio = results[-1] / results[0]
+        print(f'{backend:<8} 增量同步耗时之比 {ratio:.1f} (上限 {MAX_RATIO})')
+        ok = ok and ratio <= MAX_RATIO
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""水瓶组件重绘开销对比：每次重建画笔和瓶身 vs 缓存瓶身图
+
+用法: QT_QPA_PLATFORM=offscreen python benchmarks/bench_water_bottle.py
+统计每秒可完成的 paintEvent 次数，以及 set_values 传入相同值时触发的重绘次数。
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PySide6.QtWidgets import QApplication
+from PySide6.QtGui import QPainter, QBrush, QPen, QColor, QFont
+from PySide6.QtCore import Qt
+
+from water_bottle import WaterBottleWidget
+
+PAINTS = 2000
+
+
+class LegacyWaterBottleWidget(WaterBottleWidget):
+    """缓存之前的实现：每次重绘都重新创建画笔、字体并绘制瓶身"""
+
+    def set_values(self, current_water, daily_limit, animate=False):
+        self.current_water = current_water
+        self.daily_limit = daily_limit
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        width = self.width()
+        height = self.height()
+        bottle_width = width * 0.6
+        bottle_height = height * 0.8
+        bottle_x = (width - bottle_width) / 2
+        bottle_y = height * 0.1
+        painter.setPen(QPen(Qt.black, 2))
+        painter.drawRoundedRect(bottle_x, bottle_y, bottle_width, bottle_height, 10, 10)
+        neck_width = bottle_width * 0.4
+        neck_height = height * 0.1
+        painter.drawRect((width - neck_width) / 2, bottle_y - neck_height, neck_width, neck_height)
+        water_height = bottle_height * min(self.current_water / self.daily_limit, 1.0)
+        water_y = bottle_y + bottle_height - water_height
+        painter.setBrush(QBrush(QColor(51, 153, 255, 180)))
+        painter.drawRoundedRect(bottle_x + 2, water_y, bottle_width - 4, water_height - 2, 8, 8)
+        painter.setFont(QFont("SimHei", 10))
+        water_text = f"{self.current_water}ml / {self.daily_limit}ml"
+        painter.boundingRect(0, 0, width, 20, Qt.AlignCenter, water_text)
+        painter.drawText(0, height - 20, width, 20, Qt.AlignCenter, water_text)
+
+
+class CountingMixin:
+    counted_paints = 0
+
+    def paintEvent(self, event):
+        self.counted_paints += 1
+        super().paintEvent(event)
+
+
+def paints_per_second(widget_class):
+    widget = type('Counting' + widget_class.__name__, (CountingMixin, widget_class), {})()
+    widget.show()
+    QApplication.processEvents()
+    start = time.perf_counter()
+    for i in range(PAINTS):
+        widget.current_water = widget.displayed_water = (i * 37) % 3000
+        widget.repaint()
+    elapsed = time.perf_counter() - start
+
+    # 传入相同的值，统计由此产生的重绘次数
+    widget.set_values(1500, 3000, animate=False)
+    QApplication.processEvents()
+    before = widget.counted_paints
+    for _ in range(100):
+        widget.set_values(1500, 3000, animate=False)
+        QApplication.processEvents()
+    redundant = widget.counted_paints - before
+    widget.close()
+    return PAINTS / elapsed, redundant
+
+
+def main():
+    app = QApplication.instance() or QApplication(sys.argv)
+    print(f'{"实现":>10} {"paintEvent/秒":>14} {"相同值触发重绘":>14}')
+    for name, widget_class in (('旧实现', LegacyWaterBottleWidget), ('缓存瓶身', WaterBottleWidget)):
+        rate, redundant = paints_per_second(widget_class)
+        print(f'{name:>10} {rate:>14.0f} {redundant:>14}')
+
+
+if __name__ == '__main__':
+    main()
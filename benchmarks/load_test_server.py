@@ -0,0 +1,114 @@
+"""多用户服务压测：记录喝水接口的延迟分布
+
+用法: python benchmarks/load_test_server.py [--users 5000] [--connections 200] [--requests 50000]
+在子进程中启动 server.py(临时数据目录)，先让每个用户访问一次完成加载，再用多个keep-alive
+连接并发发送 POST /users/<用户>/drink，统计吞吐量和 p50/p90/p99/最大延迟。
+"""
+import os
+import sys
+import time
+import random
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def request(reader, writer, method, path):
+    writer.write(f'{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: 0\r\n\r\n'.encode())
+    status = (await reader.readline()).split()[1]
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line == b'\r\n':
+            break
+        if line.lower().startswith(b'content-length:'):
+            length = int(line.split(b':')[1])
+    await reader.readexactly(length)
+    if status != b'200':
+        raise RuntimeError(f'{method} {path} 返回 {status.decode()}')
+
+
+async def worker(port, jobs, latencies):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        while jobs:
+            method, path = jobs.pop()
+            start = time.perf_counter()
+            await request(reader, writer, method, path)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+async def run_phase(port, jobs, connections):
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(port, jobs, latencies) for _ in range(connections)))
+    return latencies, time.perf_counter() - start
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)]
+
+
+async def wait_ready(port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+            continue
+        await request(reader, writer, 'GET', '/health')
+        writer.close()
+        return
+
+
+async def load_test(port, users, connections, requests):
+    await wait_ready(port)
+    names = [f'user{i}' for i in range(users)]
+    _, warm_seconds = await run_phase(port, [('GET', f'/users/{name}') for name in names], connections)
+    print(f'加载 {users} 个用户: {warm_seconds * 1000:.0f} ms')
+
+    rng = random.Random(1)
+    jobs = [('POST', f'/users/{rng.choice(names)}/drink') for _ in range(requests)]
+    latencies, seconds = await run_phase(port, jobs, connections)
+    latencies.sort()
+    print(f'{requests} 次记录喝水 / {connections} 个连接: {requests / seconds:.0f} 次/秒')
+    print(f"{'p50':>8}{'p90':>8}{'p99':>8}{'最大':>8}  (ms)")
+    print(''.join(f'{percentile(latencies, q) * 1000:>8.2f}' for q in (0.5, 0.9, 0.99)) +
+          f'{latencies[-1] * 1000:>8.2f}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--connections', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=50000)
+    args = parser.parse_args()
+
+    port = free_port()
+    with tempfile.TemporaryDirectory() as directory:
+        server = subprocess.Popen([sys.executable, os.path.join(ROOT, 'server.py'),
+                                   '--port', str(port), '--data-dir', directory], stdout=subprocess.DEVNULL)
+        try:
+            asyncio.run(load_test(port, args.users, args.connections, args.requests))
+        finally:
+            server.terminate()
+            server.wait(10)
+
+
+if __name__ == '__main__':
+    main()
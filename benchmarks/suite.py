@@ -0,0 +1,379 @@
+"""性能基准测试套件：程序热点路径的耗时，结果写入JSON并可与基线比较
+
+用法: python benchmarks/suite.py [--output results.json] [--baseline base.json] [--tolerance 1.5]
+                                [--filter 关键字] [--quick]
+
+默认使用Qt的 offscreen 平台，不需要显示器。每项测试先预热一轮再重复测量多轮，记录
+最小/中位数/平均/最大耗时。指定 --baseline 时按中位数比较，超过基线 tolerance 倍
+(且至少慢 --min-delta-ms 毫秒，避免微秒级测试的噪声)即视为性能回退，进程返回 1，
+CI 据此判定失败。所有数据写在临时目录中，不会修改程序目录下的配置和喝水记录；offscreen 下使用
+platform_support 的 fake 后端，不会修改开机自启动设置或弹出系统通知。
+"""
+import os
+import sys
+import json
+import time
+import socket
+import shutil
+import argparse
+import platform
+import datetime
+import statistics
+import subprocess
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+BENCHMARKS = {}
+HISTORY_SIZES = (('10', 10), ('1k', 1000), ('100k', 100000))
+
+# 在子进程中启动托盘和主窗口，窗口第一次绘制时输出一行后退出
+STARTUP_PROBE = r'''
+import sys
+sys.path.insert(0, sys.argv[1])
+from PySide6.QtWidgets import QApplication
+from PySide6.QtCore import QObject, QEvent
+app = QApplication(sys.argv[:1])
+app.setQuitOnLastWindowClosed(False)
+import tray_app
+tray_app.APP_DIR = sys.argv[2]
+
+class FirstPaint(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            print('painted', flush=True)
+            app.exit()
+        return False
+
+tray = tray_app.WaterReminderTray()
+tray.start()
+tray.show_window()
+first_paint = FirstPaint()
+tray.window.installEventFilter(first_paint)
+app.exec()
+tray.io.stop()
+'''
+
+# 在子进程中运行单实例服务端，模拟已经在运行的程序
+INSTANCE_PROBE = r'''
+import sys
+sys.path.insert(0, sys.argv[1])
+from PySide6.QtCore import QCoreApplication
+app = QCoreApplication(sys.argv[:1])
+from instance_server import InstanceServer
+server = InstanceServer(sys.argv[2])
+print('ready' if server.listen() else 'failed', flush=True)
+app.exec()
+'''
+
+# 在子进程中运行命令行快速路径，数据写入临时目录，使用不存在的单实例通道名
+CLI_PROBE = r'''
+import sys
+sys.path.insert(0, sys.argv[1])
+import cli
+cli.APP_DIR = sys.argv[2]
+sys.exit(cli.run_cli(sys.argv[4:], sys.argv[3]))
+'''
+
+
+def benchmark(name):
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+def measure(func, rounds, setup=None, warmup=1):
+    """重复执行 func，返回每轮的耗时(秒)；setup 在每轮计时之前执行"""
+    samples = []
+    for i in range(warmup + rounds):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if i >= warmup:
+            samples.append(elapsed)
+    return samples
+
+
+class Context:
+    """各项测试共用的临时目录、QApplication 和托盘实例，都在第一次使用时创建"""
+
+    def __init__(self, quick):
+        self.quick = quick
+        self.directory = tempfile.mkdtemp(prefix='water-bench-')
+        self._app = None
+        self._tray = None
+
+    def rounds(self, full):
+        return max(full // 10, 3) if self.quick else full
+
+    def path(self, *parts):
+        path = os.path.join(self.directory, *parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    @property
+    def app(self):
+        if self._app is None:
+            from PySide6.QtWidgets import QApplication
+            self._app = QApplication.instance() or QApplication(sys.argv[:1])
+            self._app.setQuitOnLastWindowClosed(False)
+        return self._app
+
+    @property
+    def tray(self):
+        if self._tray is None:
+            self.app
+            import tray_app
+            tray_app.APP_DIR = self.path('app', '')
+            self._tray = tray_app.WaterReminderTray()
+            self._tray.start()
+            self._tray.show_window()
+            self._tray.io.flush()
+            self.app.processEvents()
+        return self._tray
+
+    def close(self):
+        if self._tray is not None:
+            self._tray.io.stop()
+            if self._tray.history is not None:
+                self._tray.history.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+@benchmark('record_drink')
+def bench_record_drink(ctx):
+    """点击喝水到界面刷新完成(含通知和提交写入任务)"""
+    tray = ctx.tray
+
+    def setup():
+        tray.core.today_drunk = 0
+        tray.window.water_bottle.stop_animation()
+
+    def run():
+        tray.record_drink('bench')
+        ctx.app.processEvents()
+    return measure(run, ctx.rounds(200), setup)
+
+
+def make_save_benchmark(backend, label, size):
+    def bench(ctx):
+        """在已有 size 条记录的存储上写入一条喝水事件"""
+        from history_store import open_history_store
+        directory = ctx.path('save', f'{backend}-{label}', '')
+        store = open_history_store(directory, backend)
+        day = datetime.date(2020, 1, 1)
+        batch = []
+        for i in range(size):
+            batch.append((300, 'bench', None, str(day + datetime.timedelta(days=i // 10))))
+            if len(batch) == 1000:
+                store.append_many(batch)
+                batch = []
+        if batch:
+            store.append_many(batch)
+        store.flush()
+        try:
+            return measure(lambda: store.append_many([(300, 'bench', None, None)]), ctx.rounds(300))
+        finally:
+            store.close()
+    return bench
+
+
+for _backend in ('eventlog', 'sqlite'):
+    for _label, _size in HISTORY_SIZES:
+        benchmark(f'save_history[{_backend}-{_label}]')(make_save_benchmark(_backend, _label, _size))
+
+
+@benchmark('paint_event')
+def bench_paint_event(ctx):
+    """水瓶控件一次完整重绘(瓶身使用缓存的pixmap)"""
+    ctx.app
+    from water_bottle import WaterBottleWidget
+    widget = WaterBottleWidget()
+    widget.resize(200, 300)
+    widget.set_values(1500, 3000, animate=False)
+    widget.show()
+    ctx.app.processEvents()
+    try:
+        return measure(widget.repaint, ctx.rounds(300))
+    finally:
+        widget.close()
+
+
+@benchmark('load_config[cold]')
+def bench_load_config_cold(ctx):
+    """第一次读取并校验 config.json"""
+    from config import ConfigFile
+    path = ctx.path('config', 'config.json')
+    ConfigFile(path).load()
+    return measure(lambda: ConfigFile(path).load(), ctx.rounds(300))
+
+
+@benchmark('load_config[cached]')
+def bench_load_config_cached(ctx):
+    """文件未变化时重新加载(只需一次 stat)"""
+    from config import ConfigFile
+    config_file = ConfigFile(ctx.path('config', 'config.json'))
+    config_file.load()
+    return measure(config_file.load, ctx.rounds(1000))
+
+
+@benchmark('startup_to_first_paint')
+def bench_startup(ctx):
+    """启动新进程直到主窗口第一次绘制(不含单实例检查和进程退出)"""
+    samples = []
+    for i in range(1 + ctx.rounds(10)):
+        directory = tempfile.mkdtemp(dir=ctx.directory)
+        start = time.perf_counter()
+        process = subprocess.Popen([sys.executable, '-c', STARTUP_PROBE, ROOT, directory],
+                                   cwd=ROOT, stdout=subprocess.PIPE, text=True)
+        elapsed = None
+        # 首次启动时还会输出创建配置文件等信息
+        for line in process.stdout:
+            if line.strip() == 'painted':
+                elapsed = time.perf_counter() - start
+                break
+        process.communicate(timeout=30)
+        if elapsed is None:
+            raise RuntimeError('启动探针没有完成首次绘制')
+        if i > 0:
+            samples.append(elapsed)
+    return samples
+
+
+def unique_instance_name():
+    return f'WaterReminder-bench-{os.getpid()}-{time.monotonic_ns()}'
+
+
+@benchmark('single_instance_check[not-running]')
+def bench_instance_not_running(ctx):
+    """没有实例在运行时的检查(连接失败)"""
+    from main import check_if_already_running
+    name = unique_instance_name()
+    return measure(lambda: check_if_already_running('ping', name), ctx.rounds(300))
+
+
+@benchmark('single_instance_check[running]')
+def bench_instance_running(ctx):
+    """已有实例在运行时发送命令并等待回复"""
+    from main import check_if_already_running
+    name = unique_instance_name()
+    server = subprocess.Popen([sys.executable, '-c', INSTANCE_PROBE, ROOT, name],
+                              cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    try:
+        if server.stdout.readline().strip() != 'ready':
+            raise RuntimeError('单实例服务端启动失败')
+        return measure(lambda: check_if_already_running('ping', name), ctx.rounds(300))
+    finally:
+        server.kill()
+        server.wait()
+
+
+def make_cli_benchmark(args):
+    def bench(ctx):
+        """启动新进程执行命令行命令直到退出(没有实例在运行，直接读写存储)"""
+        directory = tempfile.mkdtemp(dir=ctx.directory)
+        command = [sys.executable, '-c', CLI_PROBE, ROOT, directory, unique_instance_name()] + args
+
+        def run():
+            subprocess.run(command, cwd=ROOT, stdout=subprocess.DEVNULL, check=True)
+        return measure(run, ctx.rounds(20))
+    return bench
+
+
+benchmark('cli_drink[not-running]')(make_cli_benchmark(['drink', '250']))
+benchmark('cli_status[not-running]')(make_cli_benchmark(['status']))
+
+
+def describe(samples):
+    ms = sorted(sample * 1000 for sample in samples)
+    return {
+        'rounds': len(ms),
+        'min_ms': round(ms[0], 4),
+        'median_ms': round(statistics.median(ms), 4),
+        'mean_ms': round(statistics.fmean(ms), 4),
+        'max_ms': round(ms[-1], 4),
+        'stddev_ms': round(statistics.pstdev(ms), 4),
+    }
+
+
+def machine_info():
+    try:
+        import PySide6
+        qt_version = PySide6.__version__
+    except ImportError:
+        qt_version = None
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'hostname': socket.gethostname(),
+        'pyside6': qt_version,
+        'qt_platform': os.environ.get('QT_QPA_PLATFORM'),
+        'time': datetime.datetime.now().isoformat(timespec='seconds'),
+    }
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """返回所有回退项 [(名称, 当前中位数, 基线中位数)]"""
+    regressions = []
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        limit = max(base['median_ms'] * tolerance, base['median_ms'] + min_delta_ms)
+        if stats['median_ms'] > limit:
+            regressions.append((name, stats['median_ms'], base['median_ms']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='喝水提醒性能基准测试')
+    parser.add_argument('--output', help='结果JSON文件')
+    parser.add_argument('--baseline', help='用于比较的基线结果JSON文件')
+    parser.add_argument('--tolerance', type=float, default=1.5, help='中位数超过基线的倍数上限')
+    parser.add_argument('--min-delta-ms', type=float, default=0.05, help='判定回退时至少慢的毫秒数')
+    parser.add_argument('--filter', help='只运行名称包含该关键字的测试')
+    parser.add_argument('--quick', action='store_true', help='减少重复次数，用于快速检查')
+    args = parser.parse_args(argv)
+
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['benchmarks']
+    # 原程序按当前目录查找图标
+    os.chdir(ROOT)
+
+    ctx = Context(args.quick)
+    results = {}
+    try:
+        for name, func in BENCHMARKS.items():
+            if args.filter and args.filter not in name:
+                continue
+            results[name] = describe(func(ctx))
+            stats = results[name]
+            ratio = f'{stats["median_ms"] / baseline[name]["median_ms"]:6.2f}x' if name in baseline else ''
+            print(f'{name:<36}{stats["median_ms"]:>10.3f}{stats["min_ms"]:>10.3f}{stats["max_ms"]:>10.3f}'
+                  f'{stats["rounds"]:>6}  {ratio}', flush=True)
+    finally:
+        ctx.close()
+    print(f'{"":<36}{"中位数":>7}{"最小":>8}{"最大":>8}{"轮数":>4}  (ms)')
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump({'machine': machine_info(), 'benchmarks': results}, f, ensure_ascii=False, indent=2)
+        print(f'结果已写入: {output}')
+
+    regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+    for name, current, base in regressions:
+        print(f'性能回退: {name} {base:.3f} ms -> {current:.3f} ms')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
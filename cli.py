@@ -0,0 +1,172 @@
+"""不启动图形界面的命令行快速路径
+
+用法: python main.py drink [ml ...] | undo [N] | status | export [路径] | import 路径 [--by-day] | sync [文件夹]
+
+export/import 的格式按扩展名选择(.csv、.wcol 列式二进制、.json 按天总量)，见 history_io.py。
+sync 与配置中的 sync_dir(或参数指定的文件夹)交换增量，见 sync.py。
+
+程序已在运行时，命令通过单实例通道交给它处理，托盘和主窗口立即更新；没有运行时直接读写
+程序目录下的配置和喝水记录存储。这里只导入标准库和与Qt无关的模块，启动耗时主要是Python解释器本身。
+"""
+import os
+import json
+import time
+import datetime
+
+from core import WaterCore, parse_amounts
+from config import ConfigFile, CONFIG_NAME, APP_DIR
+from single_instance import send_command, BUSY
+
+EXPORT_NAME = 'drinking_export.json'
+# 导出和导入需要读取全部历史，同步可能要访问网络盘，等待正在运行的实例回复的时间比其他命令长
+LONG_TIMEOUT = 600.0
+LONG_COMMANDS = ('export', 'import', 'sync')
+
+
+def build_command(name, values):
+    """把命令和参数转换为单实例通道的一行命令文本，参数无效时抛出 ValueError"""
+    if name == 'drink':
+        if not values:
+            return 'drink'
+        return 'drink ' + ' '.join(str(amount) for amount in parse_amounts(values))
+    if name == 'undo':
+        if not values:
+            return 'undo 1'
+        if len(values) != 1 or not values[0].isdigit() or int(values[0]) <= 0:
+            raise ValueError(f'undo 的参数必须是正整数: {" ".join(values)}')
+        return f'undo {int(values[0])}'
+    if name in ('export', 'import'):
+        # 只有导出和导入才需要，转交给正在运行的实例的其他命令不必导入存储相关的模块
+        from history_io import detect_format
+    if name == 'export':
+        if len(values) > 1:
+            raise ValueError('export 只接受一个文件路径')
+        path = values[0] if values else EXPORT_NAME
+        detect_format(path)
+        # 正在运行的实例的当前目录不一定相同，传递绝对路径
+        return 'export ' + os.path.abspath(path)
+    if name == 'import':
+        paths = [value for value in values if value != '--by-day']
+        if len(paths) != 1:
+            raise ValueError('import 需要一个文件路径')
+        detect_format(paths[0])
+        if not os.path.exists(paths[0]):
+            raise ValueError(f'文件不存在: {paths[0]}')
+        merge = 'days' if '--by-day' in values else 'events'
+        return f'import {merge} {os.path.abspath(paths[0])}'
+    if name == 'sync':
+        if len(values) > 1:
+            raise ValueError('sync 只接受一个文件夹路径')
+        if not values:
+            return 'sync'
+        if not os.path.isdir(values[0]):
+            raise ValueError(f'文件夹不存在: {values[0]}')
+        return 'sync ' + os.path.abspath(values[0])
+    if name == 'status' and not values:
+        return 'status'
+    raise ValueError(f'无效的命令: {" ".join([name] + list(values))}')
+
+
+def format_status(status):
+    next_reminder = status.get('next_reminder') or '程序未运行，不会提醒'
+    return (f'{status["today"]} 今日已喝水: {status["today_drunk"]}ml / {status["daily_limit"]}ml '
+            f'({status["progress"]}%)，下一次提醒: {next_reminder}')
+
+
+def format_export(result):
+    return f'已导出 {result["count"]} 条喝水记录到 {result["path"]}'
+
+
+def format_import(result):
+    return f'已导入 {result["imported"]} 条喝水记录，跳过已有的 {result["skipped"]} 条'
+
+
+def format_sync(result):
+    return f'已同步：发送 {result["pushed"]} 条、接收 {result["pulled"]} 条喝水记录'
+
+
+FORMATTERS = {'status': format_status, 'export': format_export, 'import': format_import, 'sync': format_sync}
+
+
+def forward(command, name=None):
+    """把命令交给正在运行的实例，返回要输出的文字；没有实例在运行时返回 None
+
+    实例在运行但没有及时回复时抛出 RuntimeError，不能改为直接写入文件，否则两个进程会同时写事件日志。
+    """
+    command_name = command.partition(' ')[0]
+    timeout = LONG_TIMEOUT if command_name in LONG_COMMANDS else 2.0
+    reply = send_command(command, name, timeout)
+    if reply is None:
+        return None
+    if reply is BUSY:
+        raise RuntimeError('程序正在运行但没有响应，命令未执行，请稍后再试')
+    status, _, text = reply.partition(' ')
+    if status != 'ok':
+        raise RuntimeError(f'正在运行的程序无法处理命令: {reply}')
+    if command_name in FORMATTERS:
+        return FORMATTERS[command_name](json.loads(text))
+    # 喝水和撤销在回复之后才处理，随后的查询会在它们之后执行，得到的是处理后的状态
+    reply = send_command('status', name)
+    if reply is None or reply is BUSY or not reply.startswith('ok '):
+        return '已交给正在运行的程序处理'
+    return format_status(json.loads(reply[3:]))
+
+
+def run_local(command, today=None):
+    """没有实例在运行时直接读写喝水记录存储，返回要输出的文字"""
+    from history_store import open_history_store, DEFAULT_HISTORY_BACKEND
+    from history_io import export_history, import_history
+    name, *args = command.split(' ')
+    today = today or datetime.date.today()
+    config, _ = ConfigFile(os.path.join(APP_DIR, CONFIG_NAME)).load()
+    store = open_history_store(APP_DIR, config.get('history_backend', DEFAULT_HISTORY_BACKEND))
+    try:
+        if name == 'export':
+            path = ' '.join(args)
+            return format_export({'path': path, 'count': export_history(store, path)})
+        if name == 'import':
+            return format_import(import_history(store, ' '.join(args[1:]), args[0]))
+        if name == 'sync':
+            return format_sync(sync_local(store, config, ' '.join(args)))
+        core = WaterCore(config, today)
+        core.add_stored(today, store.day_total(today))
+        deltas, source = [], None
+        if name == 'drink':
+            deltas, source = core.record_many(parse_amounts(args) if args else [core.drink_amount]), 'cli'
+        elif name == 'undo':
+            core.restore_events(today, store.day_events(today))
+            deltas, source = core.undo(int(args[0])), 'undo'
+            if not deltas:
+                return '今天没有可以撤销的喝水记录'
+        now = time.time()
+        events = [(delta, source, now, str(today)) for delta in deltas if delta]
+        if events:
+            store.append_many(events)
+        return format_status(core.status())
+    finally:
+        store.close()
+
+
+def sync_local(store, config, path=''):
+    """没有实例在运行时直接与同步文件夹交换增量"""
+    from sync import SyncFolder, load_device_id, sync_folder_path
+    path = path or sync_folder_path(config, APP_DIR)
+    if path is None:
+        raise ValueError('没有设置同步文件夹，请在配置文件中设置 sync_dir 或在命令中指定文件夹')
+    if not store.has_events:
+        raise ValueError('当前的存储后端不保存逐条记录，无法同步，请使用 eventlog 或 sqlite')
+    return SyncFolder(path, load_device_id(APP_DIR)).sync(store)
+
+
+def run_cli(args, name=None):
+    """命令行入口，args 为命令名及其参数，返回进程退出码"""
+    try:
+        command = build_command(args[0], args[1:])
+        text = forward(command, name)
+        if text is None:
+            text = run_local(command)
+    except (ValueError, RuntimeError, OSError) as e:
+        print(str(e))
+        return 1
+    print(text)
+    return 0
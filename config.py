@@ -0,0 +1,90 @@
+import os
+import json
+
+from core import DEFAULT_CONFIG, validate_config
+from fileio import atomic_write_bytes
+
+CONFIG_NAME = 'config.json'
+# 程序目录，配置和喝水记录都保存在这里
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class ConfigFile:
+    """config.json 的内存缓存
+
+    load() 先比较文件的修改时间和大小，没变化时直接返回缓存，只花一次 stat；
+    内容不变(例如只是被重新保存)时不会重新解析。文件只在确实需要时写入：
+    文件不存在，或缺少必要的配置项。格式错误或取值无效的修改会被忽略并保留上一次的有效配置。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.config = None
+        self._stamp = None
+        self._raw = None
+
+    def _read_stamp(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def load(self):
+        """返回 (配置, 是否与上一次不同)"""
+        stamp = self._read_stamp()
+        if stamp is not None and stamp == self._stamp:
+            return self.config, False
+
+        if stamp is None:
+            # 配置文件不存在，创建默认配置
+            config = dict(DEFAULT_CONFIG)
+            self._write(config)
+            print(f'配置文件已创建: {self.path}')
+            return self._replace(config)
+
+        try:
+            with open(self.path, 'rb') as f:
+                raw = f.read()
+        except OSError as e:
+            print(f'读取配置文件失败: {str(e)}')
+            return self._fallback()
+        self._stamp = stamp
+        if raw == self._raw:
+            return self.config, False
+        self._raw = raw
+
+        try:
+            config = validate_config(json.loads(raw.decode('utf-8')))
+        except ValueError as e:
+            print(f'配置文件无效，继续使用之前的配置: {str(e)}')
+            return self._fallback()
+
+        # 确保配置有所有必要的键，缺少时补全并写回
+        missing = [key for key in DEFAULT_CONFIG if key not in config]
+        if missing:
+            for key in missing:
+                config[key] = DEFAULT_CONFIG[key]
+            self._write(config)
+        return self._replace(config)
+
+    def _fallback(self):
+        if self.config is None:
+            return self._replace(dict(DEFAULT_CONFIG))
+        return self.config, False
+
+    def _replace(self, config):
+        changed = config != self.config
+        self.config = config
+        return config, changed
+
+    def _write(self, config):
+        raw = json.dumps(config, ensure_ascii=False, indent=2).encode('utf-8')
+        try:
+            atomic_write_bytes(self.path, raw)
+        except OSError as e:
+            print(f'保存配置文件失败: {str(e)}')
+            return
+        # 自己写入的内容不需要再次解析
+        self._stamp = self._read_stamp()
+        self._raw = raw
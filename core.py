@@ -0,0 +1,204 @@
+import re
+import time
+import datetime
+from array import array
+
+from scheduler import parse_quiet_hours
+
+DEFAULT_CONFIG = {
+    "daily_limit": 3000,
+    "drink_amount": 300,
+    "reminder_interval": 30
+}
+# 数值配置项的合法范围(含两端)
+CONFIG_LIMITS = {
+    'daily_limit': (1, 20000),
+    'drink_amount': (1, 5000),
+    'reminder_interval': (1, 24 * 60),
+    'snooze_minutes': (1, 24 * 60),
+    'metrics_port': (0, 65535),
+    'sync_interval': (1, 24 * 60),
+}
+BOOL_KEYS = ('metrics', 'lean_resident')
+# 一次最多批量记录的次数
+MAX_BATCH = 20
+
+
+def validate_config(config):
+    """检查配置项的类型和取值范围，返回配置的副本，无效时抛出 ValueError"""
+    if not isinstance(config, dict):
+        raise ValueError('配置必须是JSON对象')
+    for key, (low, high) in CONFIG_LIMITS.items():
+        if key not in config:
+            continue
+        value = config[key]
+        if isinstance(value, bool) or not isinstance(value, int) or not low <= value <= high:
+            raise ValueError(f'{key} 必须是 {low}~{high} 之间的整数: {value!r}')
+    for key in BOOL_KEYS:
+        if not isinstance(config.get(key, False), bool):
+            raise ValueError(f'{key} 必须是 true 或 false: {config[key]!r}')
+    quiet_hours = config.get('quiet_hours')
+    if quiet_hours and parse_quiet_hours(quiet_hours) is None:
+        raise ValueError(f'quiet_hours 无效: {quiet_hours!r}')
+    if not isinstance(config.get('sync_dir', ''), str):
+        raise ValueError(f'sync_dir 必须是文件夹路径: {config["sync_dir"]!r}')
+    return dict(config)
+
+
+def parse_amounts(text):
+    """把 "250 200"、"250,200" 或 "250+200" 之类的输入解析为水量列表，无效时抛出 ValueError"""
+    if not isinstance(text, str):
+        text = ' '.join(str(part) for part in text)
+    parts = [part for part in re.split(r'[\s,，+]+', text) if part]
+    if not parts:
+        raise ValueError('请输入水量')
+    if len(parts) > MAX_BATCH:
+        raise ValueError(f'一次最多记录 {MAX_BATCH} 次')
+    low, high = CONFIG_LIMITS['drink_amount']
+    amounts = []
+    for part in parts:
+        if not part.isdigit() or not low <= int(part) <= high:
+            raise ValueError(f'水量必须是 {low}~{high} 之间的整数: {part}')
+        amounts.append(int(part))
+    return amounts
+
+
+class EventBuffer:
+    """逐条喝水事件的定长记录：时间戳和水量分别保存在两个 array 中
+
+    每条事件固定占12字节(双精度时间戳 + 32位整数水量)，没有逐条的Python对象，
+    多年的记录也只占几MB内存，按列扫描也很快。
+    """
+
+    __slots__ = ('times', 'amounts')
+
+    def __init__(self):
+        self.times = array('d')
+        self.amounts = array('i')
+
+    def __len__(self):
+        return len(self.amounts)
+
+    def append(self, ts, amount):
+        self.times.append(ts)
+        self.amounts.append(amount)
+
+    def pop(self, count):
+        """从末尾移除最多 count 条，按从新到旧的顺序返回它们的水量"""
+        count = min(count, len(self.amounts))
+        if count <= 0:
+            return []
+        popped = self.amounts[-count:].tolist()
+        del self.times[-count:]
+        del self.amounts[-count:]
+        popped.reverse()
+        return popped
+
+    def clear(self):
+        del self.times[:]
+        del self.amounts[:]
+
+    def total(self):
+        return sum(self.amounts)
+
+
+class WaterCore:
+    """单个用户的喝水状态，不依赖Qt
+
+    托盘程序和多用户服务模式共用同一套规则：跨天清零、按每日上限截断、清空今日记录。
+    所有修改都返回应写入历史的事件水量，是否以及何时持久化由调用方决定。
+    今天实际计入的每一次喝水保存在 events 中，用于撤销最近的几次记录。
+    """
+
+    __slots__ = ('daily_limit', 'drink_amount', 'reminder_interval', 'quiet_hours', 'snooze_minutes',
+                 'today', 'today_drunk', 'events')
+
+    def __init__(self, config=None, today=None):
+        self.today = today or datetime.date.today()
+        self.today_drunk = 0
+        self.events = EventBuffer()
+        self.apply_config(config or DEFAULT_CONFIG)
+
+    def apply_config(self, config):
+        self.daily_limit = config.get('daily_limit', 3000)
+        self.drink_amount = config.get('drink_amount', 300)
+        self.reminder_interval = config.get('reminder_interval', 30)
+        self.quiet_hours = parse_quiet_hours(config.get('quiet_hours'))
+        self.snooze_minutes = config.get('snooze_minutes', 10)
+
+    def roll_over(self, today=None):
+        """检查是否跨天，跨天时清零今日喝水量并返回 True"""
+        today = today or datetime.date.today()
+        if today == self.today:
+            return False
+        self.today = today
+        self.today_drunk = 0
+        self.events.clear()
+        return True
+
+    def add_stored(self, day, total):
+        """把存储中已保存的当天总量加到内存状态上(异步加载完成时调用)"""
+        if day == self.today:
+            self.today_drunk += total
+
+    def restore_events(self, day, events):
+        """按顺序重放存储中当天的 (时间戳, 水量, 来源) 事件，恢复可撤销的记录
+
+        清空会丢弃之前的记录，来源为 'undo' 的事件撤销最近的一条；在加载完成前已经记录的喝水排在它们之后。
+        """
+        if day != self.today:
+            return
+        restored = EventBuffer()
+        for ts, amount, source in events:
+            if amount > 0:
+                restored.append(ts, amount)
+            elif source == 'undo':
+                restored.pop(1)
+            else:
+                restored.clear()
+        for ts, amount in zip(self.events.times, self.events.amounts):
+            restored.append(ts, amount)
+        self.events = restored
+
+    def record(self, amount=None, today=None):
+        """记录一次喝水，超出每日上限的部分不计入，返回实际增加的水量"""
+        self.roll_over(today)
+        amount = self.drink_amount if amount is None else amount
+        previous = self.today_drunk
+        self.today_drunk = max(previous, min(previous + amount, self.daily_limit))
+        delta = self.today_drunk - previous
+        if delta:
+            self.events.append(time.time(), delta)
+        return delta
+
+    def record_many(self, amounts, today=None):
+        """依次记录多次喝水，返回每次实际增加的水量"""
+        return [self.record(amount, today) for amount in amounts]
+
+    def undo(self, count=1, today=None):
+        """撤销今天最近的 count 次喝水，返回需要写入的(负)水量列表，从最近的一次开始"""
+        self.roll_over(today)
+        undone = self.events.pop(count)
+        self.today_drunk = max(self.today_drunk - sum(undone), 0)
+        return [-amount for amount in undone]
+
+    def clear(self):
+        """清空今日喝水记录，返回需要写入的(负)水量"""
+        cleared = self.today_drunk
+        self.today_drunk = 0
+        self.events.clear()
+        return -cleared
+
+    def progress_percent(self):
+        return int(self.today_drunk / self.daily_limit * 100)
+
+    def status(self):
+        return {
+            'today': str(self.today),
+            'today_drunk': self.today_drunk,
+            'daily_limit': self.daily_limit,
+            'drink_amount': self.drink_amount,
+            'reminder_interval': self.reminder_interval,
+            'progress': self.progress_percent(),
+            'undoable': len(self.events),
+        }
@@ -0,0 +1,60 @@
+import os
+import json
+import tempfile
+from contextlib import contextmanager
+
+from metrics import metrics
+
+
+def atomic_write_bytes(path, data):
+    """原子写入文件：先写临时文件并落盘，再用os.replace替换目标文件
+
+    进程在写入过程中崩溃时，目标文件要么是旧内容，要么是新内容，不会出现半截文件。
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        metrics.count('disk_written_bytes_total', len(data), file=os.path.basename(path))
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+@contextmanager
+def atomic_open(path, mode='wb', encoding=None, newline=None):
+    """流式原子写入：返回临时文件对象，正常退出时落盘并替换目标文件，出错时删除临时文件
+
+    用于大文件的分块写入，不需要先在内存中拼出完整内容。
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, mode, encoding=encoding, newline=newline) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+            size = f.tell()
+        os.replace(tmp_path, path)
+        metrics.count('disk_written_bytes_total', size, file=os.path.basename(path))
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_json(path, data):
+    """以与原程序相同的格式(UTF-8、缩进2)原子写入JSON文件"""
+    text = json.dumps(data, ensure_ascii=False, indent=2)
+    atomic_write_bytes(path, text.encode('utf-8'))
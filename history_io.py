@@ -0,0 +1,276 @@
+"""喝水记录的批量导出和导入，用于备份和合并多台电脑上的数据
+
+支持三种格式(按扩展名选择)：
+- .csv：每行一条事件 ts,day,ml,source，可以用表格软件查看
+- .wcol：列式二进制格式。事件按行组保存，每个行组内各列连续存放：时间戳(毫秒)和日期做差分编码，
+  来源做字典编码，每列再用zlib压缩，与Parquet的布局类似，体积只有CSV的几分之一
+- .json：只有按天总量的旧版 {日期: 水量} 格式
+
+导出从存储中逐条读取、按行组写出，导入按块批量写入存储，内存占用与记录总数无关
+(按天的汇总与天数成正比；按事件合并时需要每条已有事件8字节的排序键)。只有按天汇总而没有逐条事件的数据
+(旧版JSON存储、从旧版迁移的天数)在导出时补一条当天零点、来源为 'migrated' 的事件，
+因此导出文件总能还原每天的总量。
+"""
+import os
+import csv
+import sys
+import json
+import zlib
+import struct
+import datetime
+from array import array
+from bisect import bisect_left
+from itertools import accumulate, chain
+from operator import sub
+
+from fileio import atomic_open
+from history_store import event_key, export_json_history, read_json_history
+
+FORMATS = {'.csv': 'csv', '.wcol': 'columnar', '.json': 'json'}
+COLUMNAR_MAGIC = b'WRCOL1\n\0'
+# 列式格式每个行组的事件数，也是导出时内存中最多缓存的事件数
+ROW_GROUP_SIZE = 65536
+# 导入时每次写入存储的事件数
+IMPORT_BATCH = 10000
+CSV_HEADER = ['ts', 'day', 'ml', 'source']
+# events: 按事件去重后合并；days: 按天取较大的总量
+MERGE_MODES = ('events', 'days')
+
+_GROUP_HEADER = struct.Struct('<I')
+_BLOCK_LENGTH = struct.Struct('<I')
+
+
+def detect_format(path):
+    """按扩展名返回格式名，不支持时抛出 ValueError"""
+    fmt = FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f'不支持的文件格式: {path}(支持 {", ".join(FORMATS)})')
+    return fmt
+
+
+def _midnight(day):
+    return datetime.datetime.combine(datetime.date.fromisoformat(day), datetime.time()).timestamp()
+
+
+def iter_export_rows(store):
+    """按时间顺序产出全部事件 (时间戳, 日期, 水量, 来源)，最后补上逐条事件之外的按天总量"""
+    event_totals = {}
+    for ts, day, ml, source in store.iter_events():
+        event_totals[day] = event_totals.get(day, 0) + ml
+        yield ts, day, ml, source
+    for day, total in sorted(store.days().items()):
+        missing = total - event_totals.get(day, 0)
+        if missing:
+            yield _midnight(day), day, missing, 'migrated'
+
+
+def write_csv(rows, f):
+    writer = csv.writer(f, lineterminator='\n')
+    writer.writerow(CSV_HEADER)
+    count = 0
+    for ts, day, ml, source in rows:
+        writer.writerow((f'{ts:.3f}', day, ml, source))
+        count += 1
+    return count
+
+
+def read_csv(f):
+    reader = csv.reader(f)
+    if next(reader, None) != CSV_HEADER:
+        raise ValueError(f'CSV文件的表头必须是 {",".join(CSV_HEADER)}')
+    valid_days = set()
+    for line, row in enumerate(reader, 2):
+        try:
+            ts, day, ml, source = row
+            ts, ml = float(ts), int(ml)
+            if day not in valid_days:
+                datetime.date.fromisoformat(day)
+                valid_days.add(day)
+        except ValueError:
+            raise ValueError(f'CSV第{line}行无效: {",".join(row)}')
+        yield ts, day, ml, source
+
+
+def _pack(column):
+    if sys.byteorder == 'big':
+        column.byteswap()
+    return zlib.compress(column.tobytes())
+
+
+def _unpack(data, typecode):
+    column = array(typecode)
+    column.frombytes(zlib.decompress(data))
+    if sys.byteorder == 'big':
+        column.byteswap()
+    return column
+
+
+def _write_row_group(f, times, days, amounts, sources, source_names):
+    blocks = [
+        zlib.compress(json.dumps(source_names, ensure_ascii=False).encode('utf-8')),
+        # 时间戳和日期基本递增，差分后都是小整数，压缩效果很好
+        _pack(array('q', map(sub, times, chain((0,), times)))),
+        _pack(array('i', map(sub, days, chain((0,), days)))),
+        _pack(amounts),
+        _pack(sources),
+    ]
+    f.write(_GROUP_HEADER.pack(len(amounts)))
+    for block in blocks:
+        f.write(_BLOCK_LENGTH.pack(len(block)))
+        f.write(block)
+
+
+def write_columnar(rows, f):
+    """按行组写出列式格式，返回事件数"""
+    f.write(COLUMNAR_MAGIC)
+    count = 0
+    times, days, amounts, sources = array('q'), array('i'), array('i'), array('B')
+    source_ids = {}
+    ordinals = {}
+    for ts, day, ml, source in rows:
+        ordinal = ordinals.get(day)
+        if ordinal is None:
+            ordinal = ordinals[day] = datetime.date.fromisoformat(day).toordinal()
+        source_id = source_ids.get(source)
+        if source_id is None:
+            if len(source_ids) == 256:
+                raise ValueError('一个行组中的来源种类过多')
+            source_id = source_ids[source] = len(source_ids)
+        times.append(round(ts * 1000))
+        days.append(ordinal)
+        amounts.append(ml)
+        sources.append(source_id)
+        if len(amounts) == ROW_GROUP_SIZE:
+            _write_row_group(f, times, days, amounts, sources, list(source_ids))
+            count += len(amounts)
+            times, days, amounts, sources = array('q'), array('i'), array('i'), array('B')
+            source_ids = {}
+    if amounts:
+        _write_row_group(f, times, days, amounts, sources, list(source_ids))
+        count += len(amounts)
+    # 行数为0的行组表示文件结束，用于发现被截断的文件
+    f.write(_GROUP_HEADER.pack(0))
+    return count
+
+
+def _read_exact(f, size):
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError('列式文件不完整')
+    return data
+
+
+def read_columnar(f):
+    """逐个行组读取列式格式，产出 (时间戳, 日期, 水量, 来源)"""
+    if f.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+        raise ValueError('不是喝水记录的列式文件')
+    day_names = {}
+    while True:
+        rows, = _GROUP_HEADER.unpack(_read_exact(f, _GROUP_HEADER.size))
+        if rows == 0:
+            return
+        blocks = []
+        for _ in range(5):
+            length, = _BLOCK_LENGTH.unpack(_read_exact(f, _BLOCK_LENGTH.size))
+            blocks.append(_read_exact(f, length))
+        try:
+            source_names = json.loads(zlib.decompress(blocks[0]).decode('utf-8'))
+            columns = [_unpack(blocks[1], 'q'), _unpack(blocks[2], 'i'),
+                       _unpack(blocks[3], 'i'), _unpack(blocks[4], 'B')]
+        except (zlib.error, ValueError) as e:
+            raise ValueError(f'列式文件已损坏: {str(e)}')
+        # 任何一列短了 zip 都会静默截断，在产出这个行组的事件之前检查全部四列
+        if any(len(column) != rows for column in columns):
+            raise ValueError('列式文件已损坏: 列的长度不一致')
+        time_deltas, day_deltas, amounts, sources = columns
+        if max(sources) >= len(source_names):
+            raise ValueError('列式文件已损坏: 来源编号超出字典')
+        for ts_ms, ordinal, ml, source_id in zip(accumulate(time_deltas), accumulate(day_deltas), amounts, sources):
+            day = day_names.get(ordinal)
+            if day is None:
+                day = day_names[ordinal] = datetime.date.fromordinal(ordinal).isoformat()
+            yield ts_ms / 1000, day, ml, source_names[source_id]
+
+
+def read_history(path):
+    """按扩展名逐条读取导出文件中的事件"""
+    fmt = detect_format(path)
+    if fmt == 'json':
+        for day, ml in sorted(read_json_history(path).items()):
+            yield _midnight(day), day, ml, 'migrated'
+    elif fmt == 'csv':
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            yield from read_csv(f)
+    else:
+        with open(path, 'rb') as f:
+            yield from read_columnar(f)
+
+
+def export_history(store, path):
+    """把 store 中的全部喝水记录流式写入 path，格式按扩展名选择，返回写出的事件数(JSON为天数)"""
+    fmt = detect_format(path)
+    if fmt == 'json':
+        return export_json_history(store, path)
+    if fmt == 'csv':
+        with atomic_open(path, 'w', encoding='utf-8', newline='') as f:
+            return write_csv(iter_export_rows(store), f)
+    with atomic_open(path, 'wb') as f:
+        return write_columnar(iter_export_rows(store), f)
+
+
+def import_history(store, path, merge='events'):
+    """把导出文件合并到 store，返回 {'imported': 新增事件数, 'skipped': 跳过数, 'days': {日期: 增加的水量}}
+
+    merge='events' 时按 (时间戳, 水量) 去重：文件中的事件在存储中已有几条相同的就跳过几条，
+    重复导入同一个文件或导入包含本机记录的备份都不会重复计算；
+    merge='days' 时按天合并，文件中某天的总量大于已有总量时才补上差额(来源为 'import')。
+    不保存逐条事件的存储(旧版JSON)无法按事件去重，总是按天合并。
+    """
+    if merge not in MERGE_MODES:
+        raise ValueError(f'未知的合并方式: {merge}')
+    rows = read_history(path)
+    if merge == 'days' or not store.has_events:
+        return _merge_days(store, rows)
+
+    # 已有事件的排序键，每条只占8字节；used 标记已经与文件中的事件匹配过的键
+    existing = array('Q', sorted(event_key(ts, ml) for ts, _, ml, _ in iter_export_rows(store)))
+    used = bytearray(len(existing))
+    size = len(existing)
+    batch = []
+    imported = skipped = 0
+    day_deltas = {}
+    for ts, day, ml, source in rows:
+        key = event_key(ts, ml)
+        i = bisect_left(existing, key)
+        while i < size and existing[i] == key and used[i]:
+            i += 1
+        if i < size and existing[i] == key:
+            used[i] = 1
+            skipped += 1
+            continue
+        batch.append((ml, source, ts, day))
+        day_deltas[day] = day_deltas.get(day, 0) + ml
+        imported += 1
+        if len(batch) == IMPORT_BATCH:
+            store.append_many(batch)
+            batch = []
+    if batch:
+        store.append_many(batch)
+    return {'imported': imported, 'skipped': skipped, 'days': day_deltas}
+
+
+def _merge_days(store, rows):
+    """按天合并，imported 和 skipped 都以天计"""
+    totals = {}
+    for _, day, ml, _ in rows:
+        totals[day] = totals.get(day, 0) + ml
+    existing = store.days()
+    events = []
+    for day, total in sorted(totals.items()):
+        missing = total - existing.get(day, 0)
+        if missing > 0:
+            events.append((missing, 'import', _midnight(day), day))
+    for start in range(0, len(events), IMPORT_BATCH):
+        store.append_many(events[start:start + IMPORT_BATCH])
+    return {'imported': len(events), 'skipped': len(totals) - len(events),
+            'days': {day: ml for ml, _, _, day in events}}
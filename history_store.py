@@ -0,0 +1,791 @@
+import os
+import sys
+import json
+import time
+import datetime
+import sqlite3
+import threading
+from collections import Counter
+
+from fileio import atomic_write_json
+from metrics import metrics
+
+EVENT_LOG_NAME = 'drinking_events.log'
+SUMMARY_NAME = 'drinking_summary.json'
+LEGACY_HISTORY_NAME = 'drinking_history.json'
+SQLITE_NAME = 'drinking_history.db'
+SERVER_DB_NAME = 'server_history.db'
+SEGMENT_PREFIX = 'drinking_events.'
+SEGMENT_SUFFIX = '.seg'
+ARCHIVE_DIR_NAME = 'drinking_events_archive'
+LOCK_NAME = 'drinking_events.lock'
+# 另一个进程(例如命令行的一次写入)只会短暂持有事件日志，打开时最多等待这么多秒
+LOCK_TIMEOUT = 2.0
+
+HISTORY_BACKENDS = ('eventlog', 'sqlite', 'json')
+DEFAULT_HISTORY_BACKEND = 'eventlog'
+
+
+class HistoryLockedError(OSError):
+    """事件日志正被另一个进程使用"""
+
+
+def _lock_file(path, timeout):
+    """以独占方式锁住 path，返回持有锁的文件对象；timeout 秒内拿不到锁时抛出 HistoryLockedError
+
+    锁由操作系统在文件关闭或进程退出时释放，程序崩溃后不会留下失效的锁。
+    """
+    f = open(path, 'a+b')
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if sys.platform == 'win32':
+                import msvcrt
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return f
+        except OSError:
+            if time.monotonic() >= deadline:
+                f.close()
+                raise HistoryLockedError(f'喝水记录正被另一个程序使用: {os.path.dirname(path)}')
+            time.sleep(0.05)
+
+
+def _unlock_file(f):
+    if sys.platform == 'win32':
+        import msvcrt
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    f.close()
+
+
+def event_key(ts, ml):
+    """同一条事件在任何存储、导出格式和设备上都相同的64位键：毫秒时间戳和水量(低20位)"""
+    return ((round(ts * 1000) << 20) | (ml & 0xFFFFF)) & 0xFFFFFFFFFFFFFFFF
+
+
+def _segment_max_day(path):
+    """分段文件名中记录的最大日期；当前日志和旧版本轮转出的分段(文件名中没有日期)返回 None"""
+    name = os.path.basename(path)
+    if not name.startswith(SEGMENT_PREFIX) or not name.endswith(SEGMENT_SUFFIX):
+        return None
+    _, _, day = name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)].partition('.')
+    return day or None
+
+
+def _event_day(ts, day):
+    if day is None:
+        return datetime.date.fromtimestamp(ts).isoformat()
+    return str(day)
+
+
+def read_json_history(path):
+    """读取旧版 {日期: 水量} 格式的喝水记录文件，文件不存在或损坏时返回空字典"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return {day: int(ml) for day, ml in data.items()}
+    except (OSError, ValueError) as e:
+        print(f'读取喝水记录失败: {str(e)}')
+        return {}
+
+
+def export_json_history(store, path):
+    """把 store 中的按天总量按日期顺序写成旧版 {日期: 水量} 格式，旧版本程序也能直接读取，返回天数"""
+    days = dict(sorted(store.days().items()))
+    atomic_write_json(path, days)
+    return len(days)
+
+
+class HistoryStore:
+    """喝水记录存储接口
+
+    所有后端都以事件(水量可为负)的方式写入，并按 'YYYY-MM-DD' 字符串的日期查询。
+    has_events 表示后端是否保存逐条事件，只有这样的后端才能在多台设备之间同步(见 sync.py)。
+    """
+
+    has_events = False
+
+    def append(self, amount, source='button', ts=None, day=None):
+        """追加一条喝水事件"""
+        raise NotImplementedError
+
+    def append_many(self, events):
+        """批量追加 (水量, 来源, 时间戳, 日期) 事件，后端可覆盖以合并成一次写入"""
+        for amount, source, ts, day in events:
+            self.append(amount, source, ts, day)
+
+    def day_total(self, day):
+        """返回某一天的喝水总量"""
+        raise NotImplementedError
+
+    def range_totals(self, start, end):
+        """返回 [start, end] 闭区间内有记录的日期及其总量"""
+        raise NotImplementedError
+
+    def days(self):
+        """返回全部 {日期: 水量}"""
+        raise NotImplementedError
+
+    def iter_events(self):
+        """按时间顺序返回所有逐条事件 (时间戳, 日期, 水量, 来源) 的可迭代对象；只保存按天汇总的后端返回空列表"""
+        return []
+
+    def day_events(self, day):
+        """按时间顺序返回某一天的逐条事件 (时间戳, 水量, 来源)，后端可覆盖以避免读取全部历史"""
+        day = str(day)
+        return [(ts, ml, source) for ts, event_day, ml, source in self.iter_events() if event_day == day]
+
+    def local_events_after(self, seq):
+        """按序号顺序返回本机记录的、序号大于 seq 的事件 (序号, 时间戳, 日期, 水量, 来源)"""
+        raise NotImplementedError
+
+    def append_remote(self, device, events):
+        """追加其他设备的事件 (设备序号, 时间戳, 日期, 水量, 来源)，序号不大于已合并的最大序号的跳过
+
+        与已有的、来自其他来源(本机或别的设备)的事件 (时间戳, 水量) 相同的事件只推进版本向量、不计入总量，
+        同一条记录经导出和导入到了另一台设备上时，两份副本同步过来只计算一次。返回 {日期: 增加的水量}。
+        """
+        raise NotImplementedError
+
+    def version_vector(self):
+        """已合并的其他设备事件的最大序号 {设备: 序号}"""
+        return {}
+
+    def is_empty(self):
+        return not self.days()
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+
+class JsonHistoryStore(HistoryStore):
+    """旧版存储格式：整个 drinking_history.json 保存 {日期: 水量}，每次保存都重写整个文件"""
+
+    def __init__(self, directory):
+        self.path = os.path.join(directory, LEGACY_HISTORY_NAME)
+        self._lock = threading.Lock()
+        self._days = read_json_history(self.path)
+
+    def append(self, amount, source='button', ts=None, day=None):
+        day = _event_day(time.time() if ts is None else ts, day)
+        with self._lock:
+            self._days[day] = self._days.get(day, 0) + int(amount)
+            atomic_write_json(self.path, self._days)
+
+    def append_many(self, events):
+        with self._lock:
+            for amount, source, ts, day in events:
+                day = _event_day(time.time() if ts is None else ts, day)
+                self._days[day] = self._days.get(day, 0) + int(amount)
+            atomic_write_json(self.path, self._days)
+
+    def day_total(self, day):
+        with self._lock:
+            return self._days.get(str(day), 0)
+
+    def range_totals(self, start, end):
+        start, end = str(start), str(end)
+        with self._lock:
+            return {day: ml for day, ml in self._days.items() if start <= day <= end}
+
+    def days(self):
+        with self._lock:
+            return dict(self._days)
+
+
+class EventLogHistoryStore(HistoryStore):
+    """基于追加写事件日志的喝水记录存储
+
+    每次喝水只向 drinking_events.log 追加一行事件(序号、时间戳、日期、水量、来源)，
+    保存的开销与历史长度无关。日志达到一定条数后，会被轮转成只读分段，
+    再由后台线程把按天汇总的结果原子写入 drinking_summary.json。
+    汇总文件记录已合并的最大序号，加载时跳过序号不大于它的事件，
+    因此在压缩过程中任意时刻崩溃都不会丢失或重复计算记录。
+    合并后的分段移入 drinking_events_archive 目录保留，供统计分析读取逐条事件，启动时不会读取它们。
+    分段的文件名是 drinking_events.<最大序号>.<最大日期>.seg：同步和导入的事件可能属于更早的日期，
+    文件中的日期并不随序号递增，按日期查询时只能根据文件中的最大日期跳过整个文件。
+    从其他设备同步来的事件额外带有设备ID和该设备上的序号('dev'、'dseq')，本机事件的设备序号就是 seq；
+    各设备已合并的最大序号(版本向量)和最后一条本机事件的序号与按天汇总一起写入汇总文件。
+    与已有事件重复的同步事件写成带 'dup' 标记的行，只用于恢复版本向量，不计入总量也不出现在逐条事件中。
+    打开时独占锁住 drinking_events.lock，同一目录的第二个写入者会在 lock_timeout 秒后失败，而不是与前者交错写出重复的序号。
+    """
+
+    has_events = True
+
+    def __init__(self, directory, compact_threshold=500, lock_timeout=0):
+        self.directory = directory
+        self.log_path = os.path.join(directory, EVENT_LOG_NAME)
+        self.summary_path = os.path.join(directory, SUMMARY_NAME)
+        self.legacy_path = os.path.join(directory, LEGACY_HISTORY_NAME)
+        self.archive_dir = os.path.join(directory, ARCHIVE_DIR_NAME)
+        self.compact_threshold = compact_threshold
+
+        self._lock = threading.RLock()
+        self._compactor = None
+        self._days = {}
+        self._seq = 0
+        self._log_events = 0
+        # 当前日志中事件的最大日期，轮转时写入分段文件名
+        self._log_max_day = ''
+        self._vv = {}
+        self._local_seq = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._lock_file = _lock_file(os.path.join(directory, LOCK_NAME), lock_timeout)
+        try:
+            self._load()
+            self._log_file = self._open_log()
+        except BaseException:
+            _unlock_file(self._lock_file)
+            raise
+
+        # 上次退出前未完成压缩的分段，在后台继续合并
+        if self._segment_paths():
+            self.compact_async()
+
+    def _segment_paths(self, directory=None):
+        directory = directory or self.directory
+        if not os.path.isdir(directory):
+            return []
+        names = [name for name in os.listdir(directory)
+                 if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)]
+        return [os.path.join(directory, name) for name in sorted(names)]
+
+    def _load(self):
+        """读取汇总文件并重放尚未合并的事件"""
+        if os.path.exists(self.summary_path):
+            with open(self.summary_path, 'r', encoding='utf-8') as f:
+                summary = json.load(f)
+        else:
+            # 首次使用时从旧版 drinking_history.json 迁移
+            summary = {'seq': 0, 'days': read_json_history(self.legacy_path)}
+            atomic_write_json(self.summary_path, summary)
+
+        compacted_seq = summary.get('seq', 0)
+        self._days = {day: int(ml) for day, ml in summary.get('days', {}).items()}
+        self._seq = compacted_seq
+        self._vv = dict(summary.get('vv', {}))
+        # 没有这一项的汇总文件来自支持同步之前的版本，其中都是本机事件
+        self._local_seq = summary.get('local_seq', compacted_seq)
+
+        for path in self._segment_paths() + [self.log_path]:
+            if not os.path.exists(path):
+                continue
+            replayed, max_day = self._replay(path, compacted_seq)
+            if path == self.log_path:
+                self._log_events = replayed
+                self._log_max_day = max_day
+
+    def _replay(self, path, compacted_seq):
+        """重放一个日志文件中的事件，返回其中的事件条数和最大日期"""
+        count = 0
+        max_day = ''
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    # 进程在写入时崩溃会留下半行，直接忽略
+                    continue
+                count += 1
+                max_day = max(max_day, event['day'])
+                seq = event['seq']
+                if seq <= compacted_seq:
+                    continue
+                if 'dup' not in event:
+                    self._days[event['day']] = self._days.get(event['day'], 0) + event['ml']
+                self._seq = max(self._seq, seq)
+                if 'dev' in event:
+                    self._vv[event['dev']] = max(self._vv.get(event['dev'], 0), event['dseq'])
+                else:
+                    self._local_seq = max(self._local_seq, seq)
+        return count, max_day
+
+    def _open_log(self):
+        log_file = open(self.log_path, 'a', encoding='utf-8')
+        # 上次写入被中断时补上换行，避免新事件接在半行后面
+        if log_file.tell() > 0:
+            with open(self.log_path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    log_file.write('\n')
+                    log_file.flush()
+        return log_file
+
+    def append(self, amount, source='button', ts=None, day=None):
+        """追加一条喝水事件，amount 可以为负数(例如清空今日记录)"""
+        if ts is None:
+            ts = time.time()
+        day = _event_day(ts, day)
+        amount = int(amount)
+
+        with self._lock:
+            self._seq += 1
+            self._local_seq = self._seq
+            event = {'seq': self._seq, 'ts': round(ts, 3), 'day': day, 'ml': amount, 'src': source}
+            line = json.dumps(event, ensure_ascii=False, separators=(',', ':')) + '\n'
+            self._log_file.write(line)
+            self._log_file.flush()
+            if metrics.enabled:
+                metrics.count('disk_written_bytes_total', len(line.encode('utf-8')), file=EVENT_LOG_NAME)
+            self._days[day] = self._days.get(day, 0) + amount
+            self._log_events += 1
+            self._log_max_day = max(self._log_max_day, day)
+            need_compaction = self._log_events >= self.compact_threshold
+
+        if need_compaction:
+            self.compact_async()
+
+    def append_many(self, events):
+        """批量追加事件，只写入并刷新一次日志"""
+        lines = []
+        with self._lock:
+            for amount, source, ts, day in events:
+                ts = time.time() if ts is None else ts
+                day = _event_day(ts, day)
+                amount = int(amount)
+                self._seq += 1
+                self._local_seq = self._seq
+                event = {'seq': self._seq, 'ts': round(ts, 3), 'day': day, 'ml': amount, 'src': source}
+                lines.append(json.dumps(event, ensure_ascii=False, separators=(',', ':')) + '\n')
+                self._days[day] = self._days.get(day, 0) + amount
+                self._log_max_day = max(self._log_max_day, day)
+            need_compaction = self._write_lines(lines)
+
+        if need_compaction:
+            self.compact_async()
+
+    def append_remote(self, device, events):
+        """追加其他设备的事件，事件和设备序号写在同一行中，崩溃后重放日志即可恢复版本向量，不会重复合并"""
+        lines = []
+        days = {}
+        with self._lock:
+            last = self._vv.get(device, 0)
+        events = [event for event in sorted(events) if event[0] > last]
+        if not events:
+            return days
+        # 只有I/O线程合并其他设备的事件，在锁外读取已有事件不会与另一次合并交错
+        existing = self._other_keys(device, min(event[2] for event in events))
+        with self._lock:
+            for dseq, ts, day, ml, source in events:
+                last = dseq
+                ml = int(ml)
+                self._seq += 1
+                event = {'seq': self._seq, 'ts': round(ts, 3), 'day': day, 'ml': ml, 'src': source,
+                         'dev': device, 'dseq': dseq}
+                key = event_key(ts, ml)
+                if existing[key]:
+                    existing[key] -= 1
+                    event['dup'] = 1
+                else:
+                    self._days[day] = self._days.get(day, 0) + ml
+                    days[day] = days.get(day, 0) + ml
+                lines.append(json.dumps(event, ensure_ascii=False, separators=(',', ':')) + '\n')
+                self._log_max_day = max(self._log_max_day, day)
+            self._vv[device] = last
+            need_compaction = self._write_lines(lines)
+
+        if need_compaction:
+            self.compact_async()
+        return days
+
+    def _other_keys(self, device, day):
+        """日期不早于 day、来源不是 device 的已计入事件的键的多重集合"""
+        return Counter(event_key(event['ts'], event['ml']) for event in self._events_since(day)
+                       if event.get('dev') != device and 'dup' not in event)
+
+    def _write_lines(self, lines):
+        """在持有锁时写入并刷新若干行事件，返回是否需要压缩"""
+        text = ''.join(lines)
+        self._log_file.write(text)
+        self._log_file.flush()
+        if metrics.enabled:
+            metrics.count('disk_written_bytes_total', len(text.encode('utf-8')), file=EVENT_LOG_NAME)
+        self._log_events += len(lines)
+        return self._log_events >= self.compact_threshold
+
+    def day_total(self, day):
+        """返回某一天的喝水总量"""
+        with self._lock:
+            return self._days.get(str(day), 0)
+
+    def range_totals(self, start, end):
+        start, end = str(start), str(end)
+        with self._lock:
+            return {day: ml for day, ml in self._days.items() if start <= day <= end}
+
+    def days(self):
+        """返回 {日期: 水量} 的副本"""
+        with self._lock:
+            return dict(self._days)
+
+    def _event_files(self):
+        """按时间顺序返回 [(路径, 读取长度)]：归档分段、待合并分段和当前日志(只读到当前长度)"""
+        with self._lock:
+            self._log_file.flush()
+            log_size = os.path.getsize(self.log_path)
+            paths = self._segment_paths(self.archive_dir) + self._segment_paths()
+        return [(path, None) for path in paths] + [(self.log_path, log_size)]
+
+    def _read_events(self, path, size=None):
+        try:
+            f = open(path, 'r', encoding='utf-8')
+        except FileNotFoundError:
+            # 读取过程中分段刚被压缩线程移入归档目录
+            f = open(os.path.join(self.archive_dir, os.path.basename(path)), 'r', encoding='utf-8')
+        with f:
+            text = f.read() if size is None else f.read(size)
+        events = []
+        for line in text.splitlines():
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                continue
+        return events
+
+    def iter_events(self):
+        """依次读取归档分段、待合并分段和当前日志中的全部事件
+
+        逐个文件读取并逐条产出，内存中同时只有一个文件的内容。
+        """
+        last_seq = 0
+        for path, size in self._event_files():
+            for event in self._read_events(path, size):
+                if event['seq'] <= last_seq:
+                    continue
+                last_seq = event['seq']
+                if 'dup' in event:
+                    continue
+                yield event['ts'], event['day'], event['ml'], event['src']
+
+    def _events_since(self, day):
+        """日期不早于 day 的事件，按序号排序返回
+
+        只读取当前日志和文件名中的最大日期不早于 day 的分段，当天的事件通常都还在当前日志中，不需要读取归档。
+        """
+        found = {}
+        for path, size in self._event_files():
+            max_day = _segment_max_day(path)
+            if max_day is not None and max_day < day:
+                continue
+            for event in self._read_events(path, size):
+                if event['day'] >= day:
+                    found[event['seq']] = event
+        return [found[seq] for seq in sorted(found)]
+
+    def day_events(self, day):
+        """某一天的事件，只读取包含这一天及之后事件的文件"""
+        day = str(day)
+        return [(event['ts'], event['ml'], event['src']) for event in self._events_since(day)
+                if event['day'] == day and 'dup' not in event]
+
+    def local_events_after(self, seq):
+        """从最新的文件往前读取，遇到第一条事件的序号不大于 seq 的文件就停止，开销只与新事件数有关"""
+        with self._lock:
+            if self._local_seq <= seq:
+                # 之后只合并过其他设备的事件，不需要读取文件
+                return []
+        found = {}
+        for path, size in reversed(self._event_files()):
+            events = self._read_events(path, size)
+            for event in events:
+                if event['seq'] > seq and 'dev' not in event:
+                    found[event['seq']] = (event['seq'], event['ts'], event['day'], event['ml'], event['src'])
+            # 序号是连续分配的，文件的第一条事件不晚于 seq 的下一条时，更早的文件中都是已发布的事件
+            if events and events[0]['seq'] <= seq + 1:
+                break
+        return [found[key] for key in sorted(found)]
+
+    def version_vector(self):
+        with self._lock:
+            return dict(self._vv)
+
+    def compact_async(self):
+        """轮转当前日志并在后台线程中写入新的汇总文件"""
+        with self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            if self._log_events:
+                self._log_file.close()
+                name = f'{SEGMENT_PREFIX}{self._seq:012d}.{self._log_max_day}{SEGMENT_SUFFIX}'
+                os.replace(self.log_path, os.path.join(self.directory, name))
+                self._log_file = open(self.log_path, 'a', encoding='utf-8')
+                self._log_events = 0
+                self._log_max_day = ''
+            segments = self._segment_paths()
+            if not segments:
+                return
+            # 此时内存中的按天汇总正好包含所有分段中的事件
+            summary = {'seq': self._seq, 'days': dict(self._days), 'vv': dict(self._vv), 'local_seq': self._local_seq}
+            self._compactor = threading.Thread(target=self._compact, args=(summary, segments),
+                                               name='history-compactor', daemon=True)
+            self._compactor.start()
+
+    def _compact(self, summary, segments):
+        try:
+            atomic_write_json(self.summary_path, summary)
+            os.makedirs(self.archive_dir, exist_ok=True)
+            for path in segments:
+                os.replace(path, os.path.join(self.archive_dir, os.path.basename(path)))
+        except OSError as e:
+            print(f'压缩喝水记录失败: {str(e)}')
+
+    def flush(self):
+        """等待正在进行的后台压缩完成"""
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._log_file.close()
+            _unlock_file(self._lock_file)
+
+
+class SqliteHistoryStore(HistoryStore):
+    """基于SQLite的喝水记录存储
+
+    使用WAL日志模式，写入不会阻塞读取；events 表上的 (day, ml) 索引覆盖了按天汇总的查询，
+    因此"最近90天"之类的范围查询只会读取区间内的索引项。
+    SQL语句均为固定文本并通过参数绑定，由sqlite3模块的语句缓存复用预编译结果。
+    从其他设备同步来的事件在 device、dseq 列中记录设备ID和该设备上的序号，本机事件这两列为空、设备序号就是 id；
+    各设备已合并的最大序号(版本向量)保存在 versions 表中，与事件在同一个事务中更新，查询时不需要扫描事件；
+    device 列上的索引使查询新的本机事件时直接跳到 (NULL, id) 处，不会扫过大量其他设备的事件。
+    与已有事件重复的同步事件不写入，只推进 versions 中的序号。
+    """
+
+    has_events = True
+
+    _SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS events ('
+        'id INTEGER PRIMARY KEY, ts REAL NOT NULL, day TEXT NOT NULL, ml INTEGER NOT NULL, source TEXT NOT NULL, '
+        'device TEXT, dseq INTEGER)',
+        'CREATE INDEX IF NOT EXISTS idx_events_day ON events (day, ml)',
+        'CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)',
+        'CREATE TABLE IF NOT EXISTS versions (device TEXT PRIMARY KEY, dseq INTEGER NOT NULL)',
+    )
+    # 旧版本创建的数据库没有同步用的列，打开时补上
+    _SYNC_COLUMNS = ('ALTER TABLE events ADD COLUMN device TEXT', 'ALTER TABLE events ADD COLUMN dseq INTEGER')
+    _DEVICE_INDEX = 'CREATE INDEX IF NOT EXISTS idx_events_device ON events (device)'
+    _INSERT_EVENT = 'INSERT INTO events (ts, day, ml, source) VALUES (?, ?, ?, ?)'
+    _INSERT_REMOTE = 'INSERT INTO events (ts, day, ml, source, device, dseq) VALUES (?, ?, ?, ?, ?, ?)'
+    _DEVICE_SEQ = 'SELECT dseq FROM versions WHERE device = ?'
+    _SET_DEVICE_SEQ = 'INSERT OR REPLACE INTO versions (device, dseq) VALUES (?, ?)'
+    _VERSION_VECTOR = 'SELECT device, dseq FROM versions'
+    _LOCAL_AFTER = 'SELECT id, ts, day, ml, source FROM events WHERE id > ? AND device IS NULL ORDER BY id'
+    _OTHER_EVENTS = 'SELECT ts, ml FROM events WHERE day >= ? AND device IS NOT ?'
+    _DAY_TOTAL = 'SELECT COALESCE(SUM(ml), 0) FROM events WHERE day = ?'
+    _RANGE_TOTALS = 'SELECT day, SUM(ml) FROM events WHERE day BETWEEN ? AND ? GROUP BY day'
+    _ALL_TOTALS = 'SELECT day, SUM(ml) FROM events GROUP BY day'
+    _EVENTS_AFTER = 'SELECT id, ts, day, ml, source FROM events WHERE id > ? ORDER BY id LIMIT ?'
+    _DAY_EVENTS = 'SELECT ts, ml, source FROM events WHERE day = ? ORDER BY id'
+    _ANY_EVENT = 'SELECT 1 FROM events LIMIT 1'
+    _GET_META = 'SELECT value FROM meta WHERE key = ?'
+    _SET_META = 'INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)'
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        # 连接会被I/O线程和GUI线程共用，由 self._lock 串行化访问
+        self._conn = sqlite3.connect(path, check_same_thread=False, cached_statements=64)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        with self._conn:
+            for statement in self._SCHEMA:
+                self._conn.execute(statement)
+            columns = {row[1] for row in self._conn.execute('PRAGMA table_info(events)')}
+            if 'device' not in columns:
+                for statement in self._SYNC_COLUMNS:
+                    self._conn.execute(statement)
+            self._conn.execute(self._DEVICE_INDEX)
+
+    def append(self, amount, source='button', ts=None, day=None):
+        if ts is None:
+            ts = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(self._INSERT_EVENT, (ts, _event_day(ts, day), int(amount), source))
+
+    def append_many(self, events):
+        now = time.time()
+        rows = []
+        for amount, source, ts, day in events:
+            ts = now if ts is None else ts
+            rows.append((ts, _event_day(ts, day), int(amount), source))
+        with self._lock, self._conn:
+            self._conn.executemany(self._INSERT_EVENT, rows)
+
+    def day_total(self, day):
+        with self._lock:
+            return self._conn.execute(self._DAY_TOTAL, (str(day),)).fetchone()[0]
+
+    def range_totals(self, start, end):
+        with self._lock:
+            return dict(self._conn.execute(self._RANGE_TOTALS, (str(start), str(end))))
+
+    def days(self):
+        with self._lock:
+            return dict(self._conn.execute(self._ALL_TOTALS))
+
+    def iter_events(self, chunk_size=10000):
+        """按 id 分块读取全部事件，每块只在持有锁时查询，遍历过程中其他线程仍可写入"""
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(self._EVENTS_AFTER, (last_id, chunk_size)).fetchall()
+            for row in rows:
+                yield row[1:]
+            if len(rows) < chunk_size:
+                return
+            last_id = rows[-1][0]
+
+    def day_events(self, day):
+        with self._lock:
+            return self._conn.execute(self._DAY_EVENTS, (str(day),)).fetchall()
+
+    def local_events_after(self, seq):
+        with self._lock:
+            return self._conn.execute(self._LOCAL_AFTER, (seq,)).fetchall()
+
+    def append_remote(self, device, events):
+        """在同一个事务中写入新事件并更新该设备已合并的最大序号"""
+        days = {}
+        with self._lock, self._conn:
+            row = self._conn.execute(self._DEVICE_SEQ, (device,)).fetchone()
+            last = row[0] if row else 0
+            events = [event for event in sorted(events) if event[0] > last]
+            if not events:
+                return days
+            existing = Counter(event_key(ts, ml) for ts, ml in
+                               self._conn.execute(self._OTHER_EVENTS, (min(event[2] for event in events), device)))
+            rows = []
+            for dseq, ts, day, ml, source in events:
+                key = event_key(ts, int(ml))
+                if existing[key]:
+                    existing[key] -= 1
+                    continue
+                rows.append((ts, day, int(ml), source, device, dseq))
+                days[day] = days.get(day, 0) + int(ml)
+            self._conn.executemany(self._INSERT_REMOTE, rows)
+            self._conn.execute(self._SET_DEVICE_SEQ, (device, events[-1][0]))
+        return days
+
+    def version_vector(self):
+        with self._lock:
+            return dict(self._conn.execute(self._VERSION_VECTOR))
+
+    def is_empty(self):
+        with self._lock:
+            return self._conn.execute(self._ANY_EVENT).fetchone() is None
+
+    def get_meta(self, key):
+        with self._lock:
+            row = self._conn.execute(self._GET_META, (key,)).fetchone()
+            return row[0] if row else None
+
+    def set_meta(self, key, value):
+        with self._lock, self._conn:
+            self._conn.execute(self._SET_META, (key, str(value)))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class MultiUserSqliteStore:
+    """服务模式下所有用户共用的SQLite存储
+
+    事件表与 SqliteHistoryStore 相同，只是多了 user 列，(user, day, ml) 索引覆盖了
+    按用户按天汇总的查询；每个用户的配置以JSON保存在 users 表中。
+    事件按 (用户, 水量, 来源, 时间戳, 日期) 批量写入。
+    """
+
+    _SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS events ('
+        'id INTEGER PRIMARY KEY, user TEXT NOT NULL, ts REAL NOT NULL, day TEXT NOT NULL, '
+        'ml INTEGER NOT NULL, source TEXT NOT NULL)',
+        'CREATE INDEX IF NOT EXISTS idx_events_user_day ON events (user, day, ml)',
+        'CREATE TABLE IF NOT EXISTS users (user TEXT PRIMARY KEY, config TEXT NOT NULL)',
+    )
+    _INSERT_EVENT = 'INSERT INTO events (user, ts, day, ml, source) VALUES (?, ?, ?, ?, ?)'
+    _DAY_TOTAL = 'SELECT COALESCE(SUM(ml), 0) FROM events WHERE user = ? AND day = ?'
+    _RANGE_TOTALS = 'SELECT day, SUM(ml) FROM events WHERE user = ? AND day BETWEEN ? AND ? GROUP BY day'
+    _GET_CONFIG = 'SELECT config FROM users WHERE user = ?'
+    _SET_CONFIG = 'INSERT OR REPLACE INTO users (user, config) VALUES (?, ?)'
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, cached_statements=64)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        with self._conn:
+            for statement in self._SCHEMA:
+                self._conn.execute(statement)
+
+    def append_many(self, events):
+        rows = [(user, ts, _event_day(ts, day), int(amount), source) for user, amount, source, ts, day in events]
+        with self._lock, self._conn:
+            self._conn.executemany(self._INSERT_EVENT, rows)
+
+    def load_user(self, user, day):
+        """返回 (用户配置或 None, 当天总量)"""
+        with self._lock:
+            row = self._conn.execute(self._GET_CONFIG, (user,)).fetchone()
+            total = self._conn.execute(self._DAY_TOTAL, (user, str(day))).fetchone()[0]
+        return (json.loads(row[0]) if row else None), total
+
+    def set_config(self, user, config):
+        with self._lock, self._conn:
+            self._conn.execute(self._SET_CONFIG, (user, json.dumps(config, ensure_ascii=False)))
+
+    def range_totals(self, user, start, end):
+        with self._lock:
+            return dict(self._conn.execute(self._RANGE_TOTALS, (user, str(start), str(end))))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def migrate_json_history(json_path, store):
+    """把旧版 {日期: 水量} 文件一次性导入到 store，已导入过或目标非空时不做任何事
+
+    每天的总量作为一条来源为 'migrated' 的事件写入，时间戳取当天零点。返回导入的天数。
+    """
+    if isinstance(store, SqliteHistoryStore) and store.get_meta('migrated_from_json'):
+        return 0
+    data = read_json_history(json_path)
+    migrated = 0
+    if data and store.is_empty():
+        events = []
+        for day, ml in sorted(data.items()):
+            midnight = datetime.datetime.combine(datetime.date.fromisoformat(day), datetime.time())
+            events.append((ml, 'migrated', midnight.timestamp(), day))
+        store.append_many(events)
+        migrated = len(events)
+    if isinstance(store, SqliteHistoryStore):
+        store.set_meta('migrated_from_json', datetime.datetime.now().isoformat(timespec='seconds'))
+    return migrated
+
+
+def open_history_store(directory, backend=DEFAULT_HISTORY_BACKEND):
+    """按配置中的 history_backend 打开对应的存储后端"""
+    if backend == 'json':
+        return JsonHistoryStore(directory)
+    if backend == 'sqlite':
+        store = SqliteHistoryStore(os.path.join(directory, SQLITE_NAME))
+        migrate_json_history(os.path.join(directory, LEGACY_HISTORY_NAME), store)
+        return store
+    if backend != 'eventlog':
+        print(f'未知的存储后端: {backend}，使用默认的 {DEFAULT_HISTORY_BACKEND}')
+    return EventLogHistoryStore(directory, lock_timeout=LOCK_TIMEOUT)
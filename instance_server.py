@@ -0,0 +1,74 @@
+from PySide6.QtCore import QObject, Signal
+from PySide6.QtNetwork import QLocalServer
+
+from single_instance import instance_name, send_command
+
+# 正在运行的实例可以接受的命令
+COMMANDS = ('ping', 'show', 'drink', 'undo')
+# 需要返回结果的查询命令，处理完成后才回复
+QUERIES = ('status', 'export', 'import', 'sync')
+
+
+class InstanceServer(QObject):
+    """单实例服务端：监听按用户命名的本地套接字，把其他进程发来的命令转交给托盘控制器"""
+
+    # 命令名, 参数列表
+    command_received = Signal(str, list)
+    # 命令名, 参数列表, 回复函数(参数为一行 "ok ..." 或 "error ..." 文本，可以在之后异步调用)
+    query_received = Signal(str, list, object)
+
+    def __init__(self, name=None, parent=None):
+        super().__init__(parent)
+        self.name = name or instance_name()
+        self.server = QLocalServer(self)
+        # 只允许当前用户连接
+        self.server.setSocketOptions(QLocalServer.UserAccessOption)
+        self.server.newConnection.connect(self.on_new_connection)
+
+    def listen(self):
+        """开始监听，如果已有其他实例在监听(包括暂时没有响应的)则返回 False
+
+        设置了 UserAccessOption 时 QLocalServer.listen 会直接替换同名的套接字文件，
+        因此要先确认没有实例在监听，否则正在运行的实例会再也无法被连接。
+        """
+        if send_command('ping', self.name) is not None:
+            return False
+        if self.server.listen(self.name):
+            return True
+        # 上次崩溃残留的套接字文件
+        QLocalServer.removeServer(self.name)
+        return self.server.listen(self.name)
+
+    def close(self):
+        self.server.close()
+
+    def on_new_connection(self):
+        while self.server.hasPendingConnections():
+            connection = self.server.nextPendingConnection()
+            connection.readyRead.connect(lambda connection=connection: self.on_ready_read(connection))
+            connection.disconnected.connect(connection.deleteLater)
+
+    def on_ready_read(self, connection):
+        if not connection.canReadLine():
+            return
+        parts = bytes(connection.readLine()).decode('utf-8', errors='replace').split()
+        if parts and parts[0] in QUERIES:
+            self.query_received.emit(parts[0], parts[1:], lambda text: self.reply(connection, text))
+            return
+        if not parts or parts[0] not in COMMANDS:
+            self.reply(connection, 'error unknown command')
+            return
+
+        # 先回复再处理，处理过程中弹出的对话框不会让发送方一直等待
+        self.reply(connection, 'ok')
+        if parts[0] != 'ping':
+            self.command_received.emit(parts[0], parts[1:])
+
+    def reply(self, connection, text):
+        try:
+            connection.write((text + '\n').encode('utf-8'))
+            connection.flush()
+            connection.disconnectFromServer()
+        except RuntimeError:
+            # 异步回复前发送方已超时断开，连接对象已被删除
+            pass
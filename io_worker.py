@@ -0,0 +1,103 @@
+import time
+import threading
+import traceback
+from collections import OrderedDict
+
+from PySide6.QtCore import QObject, Qt, Signal
+
+from metrics import metrics
+
+
+class IOWorker(QObject):
+    """专用的磁盘/注册表I/O线程
+
+    任务按提交顺序在同一个后台线程中串行执行，因此依赖先后顺序的任务(先打开存储再写入)
+    不需要额外同步。key 相同且尚未开始执行的任务会合并成一个，保留原来的排队位置，
+    只执行最后提交的函数。提交时可以指定 delay 秒的延迟，延迟内的重复提交都会被合并，
+    例如连续点击多次喝水只会触发一次写入；退出时剩余任务会忽略延迟立即执行。
+    任务的返回值通过 Qt 信号回到创建者所在的(GUI)线程，再调用 callback。
+    """
+
+    # 回调, 任务返回值
+    job_done = Signal(object, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._jobs = OrderedDict()
+        self._cond = threading.Condition()
+        self._running = False
+        self._stopping = False
+        self._anonymous = 0
+        self.executed = 0
+        self.coalesced = 0
+        self.job_done.connect(self.deliver, Qt.QueuedConnection)
+        self._thread = threading.Thread(target=self._run, name='io-worker', daemon=True)
+        self._thread.start()
+
+    def submit(self, key, func, *args, callback=None, delay=0):
+        """提交任务；key 为 None 时不参与合并"""
+        with self._cond:
+            if self._stopping:
+                raise RuntimeError('I/O线程已停止')
+            not_before = time.monotonic() + delay
+            if key is None:
+                self._anonymous += 1
+                key = ('anonymous', self._anonymous)
+            elif key in self._jobs:
+                # 合并后仍按最早一次提交的时间执行，延迟不会被不断推后
+                self.coalesced += 1
+                not_before = self._jobs[key][3]
+            self._jobs[key] = (func, args, callback, not_before)
+            self._cond.notify_all()
+
+    def pending(self):
+        with self._cond:
+            return len(self._jobs) + (1 if self._running else 0)
+
+    def flush(self, timeout=None):
+        """等待所有已提交的任务执行完毕，超时返回 False"""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._jobs and not self._running, timeout)
+
+    def stop(self, timeout=None):
+        """执行完队列中剩余的任务后停止线程(退出程序时调用)"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def deliver(self, callback, result):
+        callback(result)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if not self._jobs:
+                        if self._stopping:
+                            return
+                        self._cond.wait()
+                        continue
+                    # 队首任务还在延迟期内时等待，保持提交顺序
+                    wait = next(iter(self._jobs.values()))[3] - time.monotonic()
+                    if wait <= 0 or self._stopping:
+                        break
+                    self._cond.wait(wait)
+                key, (func, args, callback, _) = self._jobs.popitem(last=False)
+                self._running = True
+            job = key if isinstance(key, str) else 'anonymous'
+            started = time.perf_counter()
+            try:
+                result = func(*args)
+            except Exception:
+                metrics.count('io_job_errors_total', job=job)
+                print(f'I/O任务执行失败:\n{traceback.format_exc()}')
+            else:
+                if callback is not None:
+                    self.job_done.emit(callback, result)
+            finally:
+                metrics.observe('io_job_seconds', time.perf_counter() - started, job=job)
+                with self._cond:
+                    self._running = False
+                    self.executed += 1
+                    self._cond.notify_all()
@@ -0,0 +1,152 @@
+from PySide6.QtWidgets import (QMainWindow, QLabel, QPushButton, QVBoxLayout, QHBoxLayout, QWidget,
+                               QLineEdit, QSpinBox)
+from PySide6.QtGui import QFont
+from PySide6.QtCore import Qt
+
+from water_bottle import WaterBottleWidget
+
+
+class WaterReminderApp(QMainWindow):
+    """主窗口，只负责显示；状态和操作都由托盘控制器 WaterReminderTray 持有"""
+
+    def __init__(self, tray):
+        super().__init__()
+        self.tray = tray
+        self.setWindowTitle("喝水提醒")
+        self.setGeometry(100, 100, 400, 300)
+
+        # 设置窗口图标
+        self.setWindowIcon(tray.icon)
+
+        # 创建UI
+        self.init_ui()
+        tray.state_changed.connect(self.refresh)
+
+    def init_ui(self):
+        """初始化UI"""
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+
+        main_layout = QVBoxLayout(central_widget)
+        main_layout.setAlignment(Qt.AlignCenter)
+        main_layout.setSpacing(20)
+
+        # 标题
+        title_label = QLabel("喝水提醒")
+        title_font = QFont()
+        title_font.setPointSize(20)
+        title_font.setBold(True)
+        title_label.setFont(title_font)
+        title_label.setAlignment(Qt.AlignCenter)
+        main_layout.addWidget(title_label)
+
+        # 水瓶UI组件
+        self.water_bottle = WaterBottleWidget()
+        main_layout.addWidget(self.water_bottle, alignment=Qt.AlignCenter)
+
+        # 今日喝水量
+        self.water_label = QLabel()
+        self.water_label.setAlignment(Qt.AlignCenter)
+        self.water_label.setFont(QFont("SimHei", 12))
+        main_layout.addWidget(self.water_label)
+
+        # 喝水按钮
+        self.drink_button = QPushButton()
+        self.drink_button.setFont(QFont("SimHei", 12))
+        self.drink_button.setMinimumHeight(40)
+        self.drink_button.clicked.connect(lambda: self.tray.record_drink('button'))
+        main_layout.addWidget(self.drink_button)
+
+        # 其他水量，可以一次输入多个
+        amount_layout = QHBoxLayout()
+        self.amount_edit = QLineEdit()
+        self.amount_edit.setFont(QFont("SimHei", 12))
+        self.amount_edit.setPlaceholderText("其他水量(ml)，如 200 150")
+        self.amount_edit.returnPressed.connect(self.record_amounts)
+        self.amount_button = QPushButton("记录")
+        self.amount_button.setFont(QFont("SimHei", 12))
+        self.amount_button.clicked.connect(self.record_amounts)
+        amount_layout.addWidget(self.amount_edit)
+        amount_layout.addWidget(self.amount_button)
+        main_layout.addLayout(amount_layout)
+
+        # 撤销最近几次喝水
+        undo_layout = QHBoxLayout()
+        self.undo_button = QPushButton("撤销最近")
+        self.undo_button.setFont(QFont("SimHei", 12))
+        self.undo_button.setMinimumHeight(40)
+        self.undo_button.clicked.connect(lambda: self.tray.undo_drinks(self.undo_count.value()))
+        self.undo_count = QSpinBox()
+        self.undo_count.setFont(QFont("SimHei", 12))
+        self.undo_count.setRange(1, 1)
+        self.undo_count.setSuffix(" 次")
+        undo_layout.addWidget(self.undo_button)
+        undo_layout.addWidget(self.undo_count)
+        main_layout.addLayout(undo_layout)
+
+        # 清空记录按钮
+        self.clear_button = QPushButton("清空今日记录")
+        self.clear_button.setFont(QFont("SimHei", 12))
+        self.clear_button.setMinimumHeight(40)
+        self.clear_button.clicked.connect(self.tray.clear_today_history)
+        main_layout.addWidget(self.clear_button)
+
+        # 统计按钮
+        self.stats_button = QPushButton("查看统计")
+        self.stats_button.setFont(QFont("SimHei", 12))
+        self.stats_button.setMinimumHeight(40)
+        self.stats_button.clicked.connect(self.tray.show_stats)
+        main_layout.addWidget(self.stats_button)
+
+        # 进度显示
+        progress_layout = QHBoxLayout()
+        self.progress_label = QLabel("进度:")
+        self.progress_label.setFont(QFont("SimHei", 12))
+        self.progress_value = QLabel()
+        self.progress_value.setFont(QFont("SimHei", 12))
+        progress_layout.addWidget(self.progress_label)
+        progress_layout.addWidget(self.progress_value)
+        main_layout.addLayout(progress_layout)
+
+        # 状态信息
+        self.status_label = QLabel()
+        self.status_label.setAlignment(Qt.AlignCenter)
+        self.status_label.setFont(QFont("SimHei", 10))
+        main_layout.addWidget(self.status_label)
+
+        self.refresh()
+
+    def refresh(self):
+        """根据托盘控制器中的状态刷新界面"""
+        tray = self.tray
+        self.water_label.setText(f"今日已喝水: {tray.today_drunk}ml / {tray.daily_limit}ml")
+        self.progress_value.setText(f"{int(tray.today_drunk/tray.daily_limit*100)}%")
+        self.water_bottle.set_values(tray.today_drunk, tray.daily_limit)
+        self.drink_button.setText(f"喝了{tray.drink_amount}ml")
+        # 喝水记录没有加载成功时禁用所有记录操作
+        recording = tray.recording_enabled
+        for widget in (self.drink_button, self.amount_edit, self.amount_button, self.clear_button):
+            widget.setEnabled(recording)
+        undoable = len(tray.core.events) if recording else 0
+        self.undo_button.setEnabled(undoable > 0)
+        self.undo_count.setEnabled(undoable > 0)
+        self.undo_count.setMaximum(max(undoable, 1))
+        if recording:
+            self.status_label.setText("下一次提醒: " + tray.get_next_reminder_time())
+        else:
+            self.status_label.setText("喝水记录没有加载成功，已停止记录")
+
+    def record_amounts(self):
+        if self.tray.record_drink_text(self.amount_edit.text()):
+            self.amount_edit.clear()
+
+    def closeEvent(self, event):
+        # 重写关闭事件，最小化到托盘
+        if self.tray.tray_icon is None:
+            # 系统不支持托盘时直接退出
+            self.tray.shutdown()
+            return
+        event.ignore()
+        # 由托盘决定隐藏还是释放整个窗口
+        self.tray.release_window()
+        self.tray.notifier.notify('喝水提醒', '程序已最小化到托盘', timeout_ms=2000)
@@ -0,0 +1,172 @@
+import os
+import time
+import threading
+from array import array
+from contextlib import contextmanager
+
+# 每个耗时序列保留的最近样本数
+RING_SIZE = 1024
+METRIC_PREFIX = 'water_reminder_'
+QUANTILES = (0.5, 0.9, 0.99)
+# 设置该环境变量为1时从进程启动就开始记录，不依赖配置文件
+ENV_VAR = 'WATER_REMINDER_METRICS'
+
+
+class RingBuffer:
+    """定长的浮点数环形缓冲区，写入只是一次数组赋值"""
+
+    __slots__ = ('values', 'position', 'full')
+
+    def __init__(self, capacity=RING_SIZE):
+        self.values = array('d', bytes(array('d').itemsize * capacity))
+        self.position = 0
+        self.full = False
+
+    def append(self, value):
+        self.values[self.position] = value
+        self.position += 1
+        if self.position == len(self.values):
+            self.position = 0
+            self.full = True
+
+    def samples(self):
+        return self.values.tolist() if self.full else self.values[:self.position].tolist()
+
+
+class _Timing:
+    __slots__ = ('count', 'total', 'ring')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.ring = RingBuffer()
+
+
+def _series_name(name, labels):
+    if not labels:
+        return name
+    return name + '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
+
+
+def _quantile(sorted_values, q):
+    return sorted_values[min(int(len(sorted_values) * q), len(sorted_values) - 1)]
+
+
+class Metrics:
+    """可选的运行时计数和耗时统计
+
+    默认关闭，关闭时每次调用只做一次布尔判断。计数器累加总数，gauge 只保留最新值；耗时除了总次数和总时长外，
+    最近 RING_SIZE 个样本保存在环形缓冲区中用于计算分位数，内存占用固定。
+    可以在任意线程中调用(I/O线程记录磁盘写入)，导出为JSON快照或Prometheus文本格式。
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._timings = {}
+
+    def set_enabled(self, enabled):
+        self.enabled = bool(enabled)
+
+    def count(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def gauge(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name, seconds, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            timing = self._timings.get(key)
+            if timing is None:
+                timing = self._timings[key] = _Timing()
+            timing.count += 1
+            timing.total += seconds
+            timing.ring.append(seconds)
+
+    @contextmanager
+    def timed(self, name, **labels):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def snapshot(self):
+        """当前全部数据的JSON兼容字典"""
+        with self._lock:
+            counters = {_series_name(name, labels): value for (name, labels), value in self._counters.items()}
+            gauges = {_series_name(name, labels): value for (name, labels), value in self._gauges.items()}
+            timings = {}
+            for (name, labels), timing in self._timings.items():
+                samples = sorted(timing.ring.samples())
+                timings[_series_name(name, labels)] = {
+                    'count': timing.count,
+                    'sum': timing.total,
+                    'recent': len(samples),
+                    'min': samples[0],
+                    'max': samples[-1],
+                    **{f'p{int(q * 100)}': _quantile(samples, q) for q in QUANTILES},
+                }
+        return {
+            'enabled': self.enabled,
+            'uptime_seconds': time.time() - self.started,
+            'counters': counters,
+            'gauges': gauges,
+            'timings': timings,
+        }
+
+    def prometheus_text(self):
+        """Prometheus 文本格式：计数器为 counter，耗时为基于最近样本的 summary"""
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            timings = [(key, timing.count, timing.total, sorted(timing.ring.samples()))
+                       for key, timing in sorted(self._timings.items())]
+        declared = set()
+        for (name, labels), value in counters:
+            metric = METRIC_PREFIX + name
+            if metric not in declared:
+                declared.add(metric)
+                lines.append(f'# TYPE {metric} counter')
+            lines.append(f'{_series_name(metric, labels)} {value}')
+        for (name, labels), value in gauges:
+            metric = METRIC_PREFIX + name
+            if metric not in declared:
+                declared.add(metric)
+                lines.append(f'# TYPE {metric} gauge')
+            lines.append(f'{_series_name(metric, labels)} {value}')
+        for (name, labels), count, total, samples in timings:
+            metric = METRIC_PREFIX + name
+            if metric not in declared:
+                declared.add(metric)
+                lines.append(f'# TYPE {metric} summary')
+            for q in QUANTILES:
+                lines.append(f'{_series_name(metric, labels + (("quantile", q),))} {_quantile(samples, q):.6g}')
+            lines.append(f'{_series_name(metric + "_sum", labels)} {total:.6g}')
+            lines.append(f'{_series_name(metric + "_count", labels)} {count}')
+        lines.append(f'# TYPE {METRIC_PREFIX}uptime_seconds gauge')
+        lines.append(f'{METRIC_PREFIX}uptime_seconds {time.time() - self.started:.0f}')
+        return '\n'.join(lines) + '\n'
+
+
+ENV_ENABLED = os.environ.get(ENV_VAR) == '1'
+# 进程内共用的实例
+metrics = Metrics(enabled=ENV_ENABLED)
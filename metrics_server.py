@@ -0,0 +1,52 @@
+import json
+
+from PySide6.QtCore import QObject
+from PySide6.QtNetwork import QHostAddress, QTcpServer
+
+from metrics import metrics
+
+
+class MetricsServer(QObject):
+    """只监听本机的HTTP指标接口
+
+    GET /metrics 返回Prometheus文本格式，GET /metrics.json 返回JSON快照；
+    每个连接只处理一个请求，回复后关闭连接。
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.server = QTcpServer(self)
+        self.server.newConnection.connect(self.on_new_connection)
+
+    def listen(self, port):
+        return self.server.listen(QHostAddress.LocalHost, port)
+
+    def port(self):
+        return self.server.serverPort()
+
+    def close(self):
+        self.server.close()
+
+    def on_new_connection(self):
+        while self.server.hasPendingConnections():
+            connection = self.server.nextPendingConnection()
+            connection.readyRead.connect(lambda connection=connection: self.on_ready_read(connection))
+            connection.disconnected.connect(connection.deleteLater)
+
+    def on_ready_read(self, connection):
+        if not connection.canReadLine():
+            return
+        parts = bytes(connection.readLine()).decode('latin-1').split()
+        path = parts[1].split('?')[0] if len(parts) >= 2 else ''
+        if path == '/metrics':
+            status, content_type, body = '200 OK', 'text/plain; version=0.0.4; charset=utf-8', metrics.prometheus_text()
+        elif path == '/metrics.json':
+            status, content_type, body = '200 OK', 'application/json; charset=utf-8', json.dumps(metrics.snapshot())
+        else:
+            status, content_type, body = '404 Not Found', 'text/plain; charset=utf-8', 'not found\n'
+        data = body.encode('utf-8')
+        head = (f'HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n'
+                f'Content-Length: {len(data)}\r\nConnection: close\r\n\r\n')
+        connection.write(head.encode('latin-1') + data)
+        connection.flush()
+        connection.disconnectFromHost()
@@ -0,0 +1,110 @@
+from PySide6.QtWidgets import QApplication, QWidget, QLabel, QPushButton, QVBoxLayout, QHBoxLayout
+from PySide6.QtGui import QFont
+from PySide6.QtCore import QObject, Qt, QTimer
+
+# 提示窗距屏幕边缘的距离
+TOAST_MARGIN = 16
+
+
+class ToastWidget(QWidget):
+    """屏幕右下角的非模态提示窗，可带若干操作按钮，不会抢占焦点也不会阻塞事件循环"""
+
+    def __init__(self, title, text, pixmap, actions=(), timeout_ms=0, font=None):
+        super().__init__(None, Qt.Tool | Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint)
+        self.setAttribute(Qt.WA_DeleteOnClose)
+        self.setAttribute(Qt.WA_ShowWithoutActivating)
+        if font is not None:
+            self.setFont(font)
+
+        layout = QVBoxLayout(self)
+        header = QHBoxLayout()
+        icon_label = QLabel()
+        icon_label.setPixmap(pixmap)
+        header.addWidget(icon_label)
+        title_label = QLabel(f'<b>{title}</b>')
+        header.addWidget(title_label, 1)
+        layout.addLayout(header)
+        layout.addWidget(QLabel(text))
+
+        if actions:
+            buttons = QHBoxLayout()
+            for label, callback in actions:
+                button = QPushButton(label)
+                button.clicked.connect(lambda checked=False, callback=callback: self.on_action(callback))
+                buttons.addWidget(button)
+            layout.addLayout(buttons)
+
+        if timeout_ms:
+            QTimer.singleShot(timeout_ms, self, self.close)
+
+    def on_action(self, callback):
+        self.close()
+        if callback is not None:
+            # 等提示窗关闭后再执行，回调里可以放心地弹出新的提示
+            QTimer.singleShot(0, callback)
+
+    def show_at_corner(self):
+        self.adjustSize()
+        screen = QApplication.primaryScreen()
+        if screen is not None:
+            area = screen.availableGeometry()
+            self.move(area.right() - self.width() - TOAST_MARGIN, area.bottom() - self.height() - TOAST_MARGIN)
+        self.show()
+
+
+class Notifier(QObject):
+    """非阻塞通知：有系统托盘时用托盘气泡，没有托盘时优先用系统通知(platform)，
+    需要操作按钮或系统不支持时用 ToastWidget
+
+    图标、缩放后的图标和字体在创建时准备好，之后每次通知都直接复用。
+    """
+
+    def __init__(self, icon, tray_icon=None, parent=None, platform=None, icon_path=None):
+        super().__init__(parent)
+        self.icon = icon
+        self.platform = platform
+        self.icon_path = icon_path
+        self.pixmap = icon.pixmap(32, 32)
+        self.font = QFont("SimHei", 10)
+        self.tray_icon = tray_icon
+        self.toast = None
+        self._balloon_callback = None
+        if tray_icon is not None:
+            tray_icon.messageClicked.connect(self.on_balloon_clicked)
+
+    def notify(self, title, text, on_click=None, timeout_ms=3000):
+        """显示一条提示，on_click 在用户点击气泡时调用"""
+        if self.tray_icon is not None and self.tray_icon.supportsMessages():
+            self._balloon_callback = on_click
+            self.tray_icon.showMessage(title, text, self.icon, timeout_ms)
+        elif (on_click is not None or self.platform is None
+              or not self.platform.notify(title, text, self.icon_path, timeout_ms)):
+            self.show_toast(title, text, timeout_ms=timeout_ms)
+
+    def ask(self, title, text, actions, timeout_ms=0):
+        """显示带操作按钮的提示窗，actions 为 (按钮文字, 回调或None) 列表，立即返回"""
+        return self.show_toast(title, text, actions, timeout_ms)
+
+    def show_toast(self, title, text, actions=(), timeout_ms=0):
+        # 同一时间只保留一个提示窗，新的提示替换旧的
+        self.close_toast()
+        toast = ToastWidget(title, text, self.pixmap, actions, timeout_ms, self.font)
+        toast.destroyed.connect(lambda obj=None, toast=toast: self.forget_toast(toast))
+        toast.show_at_corner()
+        self.toast = toast
+        return toast
+
+    def close_toast(self):
+        if self.toast is not None:
+            self.toast.close()
+            self.toast = None
+
+    def forget_toast(self, toast):
+        # 被替换的旧提示窗稍后才销毁，不能清掉新提示窗的引用
+        if self.toast is toast:
+            self.toast = None
+
+    def on_balloon_clicked(self):
+        callback, self._balloon_callback = self._balloon_callback, None
+        if callback is not None:
+            callback()
@@ -0,0 +1,223 @@
+import os
+import sys
+import shutil
+import subprocess
+
+APP_NAME = 'WaterReminder'
+STARTUP_REG_PATH = r'Software\Microsoft\Windows\CurrentVersion\Run'
+DESKTOP_FILE_NAME = 'water-reminder.desktop'
+# 可以用该环境变量指定后端: windows / linux / fake
+ENV_VAR = 'WATER_REMINDER_PLATFORM'
+
+
+class PlatformBackend:
+    """与操作系统相关的功能：开机自启动和系统通知
+
+    基类表示不支持的平台：没有开机自启动，通知交给Qt(托盘气泡或提示窗)显示。
+    自启动的读写会访问注册表或磁盘，调用方应在I/O线程中调用；失败时抛出 OSError。
+    """
+
+    name = 'generic'
+    supports_startup = False
+
+    def is_startup_enabled(self, command):
+        return False
+
+    def set_startup(self, enabled, command):
+        raise OSError('当前系统不支持开机自启动')
+
+    def notify(self, title, text, icon_path=None, timeout_ms=3000):
+        """用系统通知显示消息，返回 False 表示不支持，由调用方改用Qt显示"""
+        return False
+
+
+class WindowsPlatform(PlatformBackend):
+    """注册表 Run 键实现开机自启动"""
+
+    name = 'windows'
+    supports_startup = True
+
+    def is_startup_enabled(self, command):
+        import winreg
+        try:
+            key = winreg.OpenKey(winreg.HKEY_CURRENT_USER, STARTUP_REG_PATH, 0, winreg.KEY_READ)
+            value, _ = winreg.QueryValueEx(key, APP_NAME)
+            winreg.CloseKey(key)
+        except (FileNotFoundError, OSError):
+            return False
+        # 兼容旧版本只写入了程序路径的注册表值
+        return value in (sys.executable, command)
+
+    def set_startup(self, enabled, command):
+        import winreg
+        key = winreg.OpenKey(winreg.HKEY_CURRENT_USER, STARTUP_REG_PATH, 0, winreg.KEY_SET_VALUE)
+        try:
+            if enabled:
+                winreg.SetValueEx(key, APP_NAME, 0, winreg.REG_SZ, command)
+            else:
+                winreg.DeleteValue(key, APP_NAME)
+        finally:
+            winreg.CloseKey(key)
+
+
+def _gvariant_string(text):
+    return "'" + text.replace('\\', '\\\\').replace("'", "\\'").replace('\n', '\\n') + "'"
+
+
+class LinuxPlatform(PlatformBackend):
+    """XDG autostart 目录下的 .desktop 文件实现开机自启动，通过D-Bus发送桌面通知
+
+    通知使用 gdbus 命令调用 org.freedesktop.Notifications，不需要额外的Python依赖；
+    没有 gdbus 或没有D-Bus会话总线时返回 False，由Qt显示。
+    """
+
+    name = 'linux'
+    supports_startup = True
+
+    def __init__(self):
+        self._gdbus = shutil.which('gdbus') if os.environ.get('DBUS_SESSION_BUS_ADDRESS') else None
+
+    def desktop_file_path(self):
+        config_home = os.environ.get('XDG_CONFIG_HOME') or os.path.join(os.path.expanduser('~'), '.config')
+        return os.path.join(config_home, 'autostart', DESKTOP_FILE_NAME)
+
+    def is_startup_enabled(self, command):
+        try:
+            with open(self.desktop_file_path(), 'r', encoding='utf-8') as f:
+                lines = [line.strip() for line in f]
+        except OSError:
+            return False
+        return f'Exec={command}' in lines and 'Hidden=true' not in lines
+
+    def set_startup(self, enabled, command):
+        path = self.desktop_file_path()
+        if not enabled:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            return
+        from fileio import atomic_write_bytes
+        entry = ('[Desktop Entry]\n'
+                 'Type=Application\n'
+                 'Name=喝水提醒\n'
+                 f'Exec={command}\n'
+                 'X-GNOME-Autostart-enabled=true\n')
+        atomic_write_bytes(path, entry.encode('utf-8'))
+
+    def notify(self, title, text, icon_path=None, timeout_ms=3000):
+        if self._gdbus is None:
+            return False
+        args = [self._gdbus, 'call', '--session',
+                '--dest', 'org.freedesktop.Notifications',
+                '--object-path', '/org/freedesktop/Notifications',
+                '--method', 'org.freedesktop.Notifications.Notify',
+                _gvariant_string('喝水提醒'), '0', _gvariant_string(icon_path or ''),
+                _gvariant_string(title), _gvariant_string(text), '[]', '{}', str(timeout_ms)]
+        try:
+            # 不等待结果，通知服务响应慢时不阻塞界面
+            subprocess.Popen(args, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except OSError:
+            return False
+        return True
+
+
+class FakePlatform(PlatformBackend):
+    """不接触系统的后端，用于无界面的测试和性能测试
+
+    自启动状态只保存在内存中，通知记录在 notifications 列表里。
+    """
+
+    name = 'fake'
+    supports_startup = True
+
+    def __init__(self):
+        self.startup_command = None
+        self.notifications = []
+
+    def is_startup_enabled(self, command):
+        return self.startup_command == command
+
+    def set_startup(self, enabled, command):
+        self.startup_command = command if enabled else None
+
+    def notify(self, title, text, icon_path=None, timeout_ms=3000):
+        self.notifications.append((title, text))
+        return True
+
+
+BACKENDS = {
+    'windows': WindowsPlatform,
+    'linux': LinuxPlatform,
+    'fake': FakePlatform,
+    'generic': PlatformBackend,
+}
+
+_platform = None
+
+
+def detect_platform_name():
+    """按环境变量、Qt平台插件和操作系统选择后端名称"""
+    name = os.environ.get(ENV_VAR)
+    if name in BACKENDS:
+        return name
+    if name:
+        print(f'未知的平台后端: {name}')
+    # offscreen 下没有桌面环境，不应修改真实的自启动设置或弹出系统通知
+    if os.environ.get('QT_QPA_PLATFORM') == 'offscreen':
+        return 'fake'
+    if sys.platform == 'win32':
+        return 'windows'
+    if sys.platform.startswith('linux'):
+        return 'linux'
+    return 'generic'
+
+
+def get_platform():
+    """返回当前进程使用的平台后端，第一次调用时才创建"""
+    global _platform
+    if _platform is None:
+        _platform = BACKENDS[detect_platform_name()]()
+    return _platform
+
+
+def current_rss():
+    """当前进程的常驻内存(字节)，Windows上为工作集大小，无法获取时返回 None"""
+    if sys.platform == 'win32':
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+        kernel32 = ctypes.WinDLL('kernel32')
+        kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        if not kernel32.K32GetProcessMemoryInfo(kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+            return None
+        return counters.WorkingSetSize
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def trim_memory():
+    """把已释放的内存交还给操作系统(Windows裁剪工作集，Linux调用glibc的malloc_trim)"""
+    import ctypes
+    try:
+        if sys.platform == 'win32':
+            from ctypes import wintypes
+            kernel32 = ctypes.WinDLL('kernel32')
+            kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+            kernel32.K32EmptyWorkingSet(kernel32.GetCurrentProcess())
+        elif sys.platform.startswith('linux'):
+            ctypes.CDLL('libc.so.6').malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
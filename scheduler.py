@@ -0,0 +1,207 @@
+import time
+import heapq
+import datetime
+
+# 定时器最长休眠时间：即使下一次提醒还很远，也至少每隔这么久醒来一次，
+# 以便发现系统休眠/唤醒或手动修改系统时间
+MAX_SLEEP_SECONDS = 60
+# 墙上时钟与单调时钟的偏差变化超过该值时认为发生了休眠或改时间，需要重新同步
+CLOCK_JUMP_TOLERANCE = 5
+
+INTERVAL = 'interval'
+SNOOZE = 'snooze'
+
+
+def parse_quiet_hours(value):
+    """把配置中的 ["22:00", "08:00"] 转换为(开始分钟, 结束分钟)，为空或无效时返回 None"""
+    if not value:
+        return None
+    try:
+        start, end = value
+        minutes = []
+        for text in (start, end):
+            hour, minute = str(text).split(':')
+            minutes.append(int(hour) * 60 + int(minute))
+    except (TypeError, ValueError):
+        print(f'免打扰时段配置无效: {value}')
+        return None
+    if minutes[0] == minutes[1]:
+        return None
+    return tuple(minutes)
+
+
+class _Reminder:
+    __slots__ = ('interval', 'quiet_hours', 'deadline', 'reason', 'generation')
+
+    def __init__(self, interval, quiet_hours):
+        self.interval = interval
+        self.quiet_hours = quiet_hours
+        self.deadline = None
+        self.reason = INTERVAL
+        self.generation = 0
+
+
+class ReminderScheduler:
+    """与Qt无关的提醒调度器
+
+    每个提醒(按 key 区分，例如单用户程序中的 'water'，服务模式下的用户名)有自己的间隔、
+    免打扰时段和稍后提醒状态。所有即将到期的时间点放在一个最小堆中，只需一个定时器
+    等待堆顶即可；修改或取消提醒时旧的堆元素按代数(generation)惰性作废。
+
+    间隔提醒对齐到从当天零点起的整倍数(间隔60分钟即整点提醒)，每次触发后都按当前
+    墙上时间重新计算下一次，因此不会累积误差；休眠唤醒后过期的多次提醒只触发一次。
+    clock 和 monotonic 可以注入，便于用模拟时钟快速验证。
+    """
+
+    def __init__(self, clock=time.time, monotonic=time.monotonic):
+        self.clock = clock
+        self.monotonic = monotonic
+        self._reminders = {}
+        self._heap = []
+        self._clock_offset = clock() - monotonic()
+
+    def add(self, key, interval_minutes, quiet_hours=None):
+        """添加或替换一个周期提醒，quiet_hours 为 parse_quiet_hours 的返回值"""
+        reminder = _Reminder(interval_minutes * 60, quiet_hours)
+        old = self._reminders.get(key)
+        if old is not None:
+            reminder.generation = old.generation + 1
+        self._reminders[key] = reminder
+        self._schedule(key, self._next_interval_deadline(reminder, self.clock()), INTERVAL)
+
+    def update(self, key, interval_minutes=None, quiet_hours=False):
+        """修改提醒间隔或免打扰时段(quiet_hours 传 None 表示取消免打扰)，并重新计算下一次提醒"""
+        reminder = self._reminders[key]
+        if interval_minutes is not None:
+            reminder.interval = interval_minutes * 60
+        if quiet_hours is not False:
+            reminder.quiet_hours = quiet_hours
+        if reminder.reason == INTERVAL:
+            self._schedule(key, self._next_interval_deadline(reminder, self.clock()), INTERVAL)
+
+    def remove(self, key):
+        reminder = self._reminders.pop(key, None)
+        if reminder is not None:
+            reminder.generation += 1
+
+    def __contains__(self, key):
+        return key in self._reminders
+
+    def __len__(self):
+        return len(self._reminders)
+
+    def snooze(self, key, minutes):
+        """稍后提醒：取消本轮的周期提醒，minutes 分钟后再提醒一次，之后恢复周期提醒"""
+        self._schedule(key, self.clock() + minutes * 60, SNOOZE)
+
+    def deadline(self, key):
+        """某个提醒下一次触发的时间戳"""
+        reminder = self._reminders.get(key)
+        return reminder.deadline if reminder is not None else None
+
+    def next_deadline(self):
+        """所有提醒中最早的触发时间戳，没有提醒时返回 None"""
+        self._discard_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def seconds_until_next(self):
+        """距离下一次需要唤醒的秒数，已封顶为 MAX_SLEEP_SECONDS"""
+        deadline = self.next_deadline()
+        if deadline is None:
+            return MAX_SLEEP_SECONDS
+        return min(max(deadline - self.clock(), 0), MAX_SLEEP_SECONDS)
+
+    def pop_due(self):
+        """返回所有已到期的 (key, 原因) 并安排它们的下一次提醒
+
+        调用前会先检查时钟是否跳变；同一提醒无论过期多久都只返回一次。
+        在免打扰时段内才发现过期的提醒(例如休眠跨过了时段开始)不触发，推迟到时段结束后。
+        """
+        self.check_clock()
+        now = self.clock()
+        local = datetime.datetime.fromtimestamp(now)
+        due = []
+        while True:
+            self._discard_stale()
+            if not self._heap or self._heap[0][0] > now:
+                break
+            _, _, key = heapq.heappop(self._heap)
+            reminder = self._reminders[key]
+            if reminder.quiet_hours is None or not self._is_quiet(local, reminder.quiet_hours):
+                due.append((key, reminder.reason))
+            self._schedule(key, self._next_interval_deadline(reminder, now), INTERVAL)
+        return due
+
+    def check_clock(self):
+        """检测系统休眠或修改时间，发生时重新同步全部提醒，返回是否发生了跳变"""
+        offset = self.clock() - self.monotonic()
+        if abs(offset - self._clock_offset) <= CLOCK_JUMP_TOLERANCE:
+            return False
+        self._clock_offset = offset
+        self.resync()
+        return True
+
+    def resync(self):
+        """按当前时间重新计算所有周期提醒；已过期的稍后提醒保持过期，下一次 pop_due 时触发
+
+        过期的周期提醒立即触发，当前处于免打扰时段时改到时段结束时触发。
+        """
+        now = self.clock()
+        for key, reminder in self._reminders.items():
+            if reminder.reason == SNOOZE and reminder.deadline <= now:
+                continue
+            if reminder.reason == INTERVAL:
+                # 时间被调早时，原来的整点可能在很久以后，需要重新对齐
+                deadline = self._next_interval_deadline(reminder, now)
+                if reminder.deadline <= now:
+                    deadline = now
+                    if reminder.quiet_hours is not None:
+                        local = datetime.datetime.fromtimestamp(now)
+                        deadline = self._skip_quiet_hours(local, reminder.quiet_hours).timestamp()
+                self._schedule(key, deadline, INTERVAL)
+
+    def _schedule(self, key, deadline, reason):
+        reminder = self._reminders[key]
+        reminder.generation += 1
+        reminder.deadline = deadline
+        reminder.reason = reason
+        heapq.heappush(self._heap, (deadline, reminder.generation, key))
+
+    def _discard_stale(self):
+        heap = self._heap
+        while heap:
+            deadline, generation, key = heap[0]
+            reminder = self._reminders.get(key)
+            if reminder is not None and reminder.generation == generation:
+                return
+            heapq.heappop(heap)
+
+    def _next_interval_deadline(self, reminder, now):
+        """now 之后下一个对齐到间隔整倍数的时间点，并跳过免打扰时段"""
+        local = datetime.datetime.fromtimestamp(now)
+        midnight = local.replace(hour=0, minute=0, second=0, microsecond=0)
+        elapsed = (local - midnight).total_seconds()
+        slots = int(elapsed // reminder.interval) + 1
+        deadline = midnight + datetime.timedelta(seconds=slots * reminder.interval)
+        if reminder.quiet_hours is not None:
+            deadline = self._skip_quiet_hours(deadline, reminder.quiet_hours)
+        return deadline.timestamp()
+
+    @staticmethod
+    def _is_quiet(moment, quiet_hours):
+        start, end = quiet_hours
+        minute = moment.hour * 60 + moment.minute
+        if start < end:
+            return start <= minute < end
+        # 跨越午夜的时段，例如 22:00-08:00
+        return minute >= start or minute < end
+
+    @classmethod
+    def _skip_quiet_hours(cls, deadline, quiet_hours):
+        if not cls._is_quiet(deadline, quiet_hours):
+            return deadline
+        start, end = quiet_hours
+        wake = deadline.replace(hour=end // 60, minute=end % 60, second=0, microsecond=0)
+        if wake <= deadline:
+            wake += datetime.timedelta(days=1)
+        return wake
@@ -0,0 +1,384 @@
+"""多用户喝水提醒服务
+
+用法: python server.py [--host 127.0.0.1] [--port 8765] [--unix PATH] [--data-dir DIR]
+
+单个asyncio进程为大量用户提供本地HTTP/JSON接口，每个用户的状态(WaterCore)常驻内存，
+所有用户的提醒放在同一个 ReminderScheduler 中按用户名区分，只用一个任务等待最早的提醒。
+喝水记录先写入内存再由后台任务每 FLUSH_INTERVAL 秒批量写入SQLite，数据库操作全部在
+单独的线程中执行，不阻塞事件循环。
+
+接口(请求和响应体均为JSON):
+    GET  /health                  服务状态
+    GET  /users/<用户>             今日喝水量、配置和下一次提醒时间
+    POST /users/<用户>/drink       记录一次喝水，可带 {"amount": 250, "source": "..."}
+    POST /users/<用户>/clear       清空今日喝水记录
+    POST /users/<用户>/snooze      稍后提醒，可带 {"minutes": 10}
+    PUT  /users/<用户>/config      修改配置(daily_limit、drink_amount、reminder_interval 等)
+    GET  /users/<用户>/reminders   取走已触发、尚未读取的提醒
+    GET  /users/<用户>/history?days=30  最近若干天每天的喝水量
+"""
+import os
+import sys
+import json
+import time
+import signal
+import asyncio
+import argparse
+import datetime
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs, unquote
+
+from core import WaterCore, DEFAULT_CONFIG, validate_config
+from scheduler import ReminderScheduler
+from history_store import MultiUserSqliteStore, SERVER_DB_NAME
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+# 喝水记录批量写入数据库的间隔(秒)，也是服务异常退出时最多丢失的时间窗口
+FLUSH_INTERVAL = 0.05
+# 每个用户最多保留的未读提醒数
+MAX_PENDING_REMINDERS = 20
+MAX_BODY_SIZE = 64 * 1024
+MAX_USERNAME_LENGTH = 64
+MAX_HISTORY_DAYS = 3660
+# 可以通过接口修改的配置项
+USER_CONFIG_KEYS = ('daily_limit', 'drink_amount', 'reminder_interval', 'quiet_hours', 'snooze_minutes')
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class UserState:
+    __slots__ = ('core', 'config', 'reminders')
+
+    def __init__(self, config, today):
+        self.config = config
+        self.core = WaterCore(config, today)
+        self.reminders = deque(maxlen=MAX_PENDING_REMINDERS)
+
+
+class WaterServer:
+    """多用户服务的状态和请求处理，与传输方式(TCP或Unix套接字)无关"""
+
+    def __init__(self, data_dir):
+        self.store = MultiUserSqliteStore(os.path.join(data_dir, SERVER_DB_NAME))
+        # 所有数据库操作在同一个线程中按提交顺序执行
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='server-io')
+        self.scheduler = ReminderScheduler()
+        self.users = {}
+        self._loading = {}
+        self.pending_events = []
+        self.requests = 0
+        self.reminders_fired = 0
+        self._wake = None
+
+    async def run_io(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def get_user(self, user):
+        """返回用户状态，第一次访问时从数据库加载配置和当天总量"""
+        state = self.users.get(user)
+        if state is not None:
+            return state
+        # 同一用户的并发首次请求只加载一次
+        future = self._loading.get(user)
+        if future is None:
+            future = self._loading[user] = asyncio.ensure_future(self._load_user(user))
+        try:
+            return await asyncio.shield(future)
+        finally:
+            self._loading.pop(user, None)
+
+    async def _load_user(self, user):
+        today = datetime.date.today()
+        config, stored_total = await self.run_io(self.store.load_user, user, today)
+        state = UserState(config if config is not None else dict(DEFAULT_CONFIG), today)
+        state.core.add_stored(today, stored_total)
+        self.users[user] = state
+        self.scheduler.add(user, state.core.reminder_interval, state.core.quiet_hours)
+        self._reschedule()
+        return state
+
+    def _reschedule(self):
+        """提醒时间可能提前了，唤醒提醒任务重新计算等待时间"""
+        if self._wake is not None:
+            self._wake.set()
+
+    def _record(self, user, delta, source, today):
+        if delta:
+            self.pending_events.append((user, delta, source, time.time(), str(today)))
+
+    def status(self, user, state):
+        state.core.roll_over()
+        result = state.core.status()
+        deadline = self.scheduler.deadline(user)
+        result['user'] = user
+        result['next_reminder'] = (datetime.datetime.fromtimestamp(deadline).isoformat(timespec='seconds')
+                                   if deadline is not None else None)
+        return result
+
+    async def flush(self):
+        if self.pending_events:
+            events, self.pending_events = self.pending_events, []
+            try:
+                await self.run_io(self.store.append_many, events)
+            except BaseException:
+                # 写入失败时放回队列前面，下次刷新时按原来的顺序重试
+                self.pending_events[:0] = events
+                raise
+
+    async def run_flusher(self):
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f'写入喝水记录失败，{len(self.pending_events)} 条记录等待重试: {str(e)}')
+
+    async def run_reminders(self):
+        """等待调度器中最早的提醒，到期后放入对应用户的未读提醒队列"""
+        self._wake = asyncio.Event()
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.scheduler.seconds_until_next())
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            for user, reason in self.scheduler.pop_due():
+                state = self.users.get(user)
+                if state is None:
+                    continue
+                self.reminders_fired += 1
+                state.reminders.append({
+                    'time': datetime.datetime.now().isoformat(timespec='seconds'),
+                    'reason': reason,
+                    'today_drunk': state.core.today_drunk,
+                    'daily_limit': state.core.daily_limit,
+                })
+
+    async def dispatch(self, method, target, body):
+        """处理一个请求，返回 (状态码, 响应对象)"""
+        url = urlsplit(target)
+        parts = [unquote(part) for part in url.path.strip('/').split('/')]
+        if parts == ['health']:
+            return 200, {'users': len(self.users), 'requests': self.requests,
+                         'pending_writes': len(self.pending_events), 'reminders_fired': self.reminders_fired}
+        if len(parts) not in (2, 3) or parts[0] != 'users':
+            raise HttpError(404, '未知的路径')
+        user = parts[1]
+        if not user or len(user) > MAX_USERNAME_LENGTH:
+            raise HttpError(400, '用户名无效')
+        action = parts[2] if len(parts) == 3 else ''
+        handler = self.ROUTES.get((method, action))
+        if handler is None:
+            if any(key[1] == action for key in self.ROUTES):
+                raise HttpError(405, '不支持的请求方法')
+            raise HttpError(404, '未知的路径')
+        if body:
+            try:
+                data = json.loads(body)
+            except ValueError:
+                raise HttpError(400, '请求体不是有效的JSON')
+            if not isinstance(data, dict):
+                raise HttpError(400, '请求体必须是JSON对象')
+        else:
+            data = {}
+        state = await self.get_user(user)
+        return 200, await handler(self, user, state, data, parse_qs(url.query))
+
+    async def handle_status(self, user, state, data, query):
+        return self.status(user, state)
+
+    async def handle_drink(self, user, state, data, query):
+        amount = data.get('amount', query.get('amount', [None])[0])
+        if amount is not None:
+            try:
+                amount = int(amount)
+            except (TypeError, ValueError):
+                amount = 0
+            if amount <= 0:
+                raise HttpError(400, 'amount 必须是正整数')
+        delta = state.core.record(amount)
+        self._record(user, delta, str(data.get('source', 'api')), state.core.today)
+        result = self.status(user, state)
+        result['added'] = delta
+        return result
+
+    async def handle_clear(self, user, state, data, query):
+        state.core.roll_over()
+        self._record(user, state.core.clear(), 'clear', state.core.today)
+        return self.status(user, state)
+
+    async def handle_snooze(self, user, state, data, query):
+        minutes = data.get('minutes', state.core.snooze_minutes)
+        if isinstance(minutes, bool) or not isinstance(minutes, int) or minutes <= 0:
+            raise HttpError(400, 'minutes 必须是正整数')
+        self.scheduler.snooze(user, minutes)
+        self._reschedule()
+        return self.status(user, state)
+
+    async def handle_config(self, user, state, data, query):
+        unknown = set(data) - set(USER_CONFIG_KEYS)
+        if unknown:
+            raise HttpError(400, f'未知的配置项: {", ".join(sorted(unknown))}')
+        try:
+            config = validate_config({**state.config, **data})
+        except ValueError as e:
+            raise HttpError(400, str(e))
+        if config != state.config:
+            await self.run_io(self.store.set_config, user, config)
+            state.config = config
+            state.core.apply_config(config)
+            self.scheduler.update(user, state.core.reminder_interval, state.core.quiet_hours)
+            self._reschedule()
+        return self.status(user, state)
+
+    async def handle_reminders(self, user, state, data, query):
+        reminders = list(state.reminders)
+        state.reminders.clear()
+        return {'user': user, 'reminders': reminders}
+
+    async def handle_history(self, user, state, data, query):
+        try:
+            days = int(query.get('days', ['30'])[0])
+        except ValueError:
+            days = 0
+        if not 1 <= days <= MAX_HISTORY_DAYS:
+            raise HttpError(400, f'days 必须在 1~{MAX_HISTORY_DAYS} 之间')
+        # 先写入还在内存中的记录，保证结果包含刚刚记录的喝水
+        await self.flush()
+        end = datetime.date.today()
+        start = end - datetime.timedelta(days=days - 1)
+        return {'user': user, 'days': await self.run_io(self.store.range_totals, user, start, end)}
+
+    ROUTES = {
+        ('GET', ''): handle_status,
+        ('POST', 'drink'): handle_drink,
+        ('POST', 'clear'): handle_clear,
+        ('POST', 'snooze'): handle_snooze,
+        ('PUT', 'config'): handle_config,
+        ('GET', 'reminders'): handle_reminders,
+        ('GET', 'history'): handle_history,
+    }
+
+    async def handle_connection(self, reader, writer):
+        """处理一个连接上的HTTP/1.1请求，支持keep-alive"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self.respond(writer, 400, {'error': '请求行无效'}, False)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                try:
+                    length = int(headers.get('content-length', 0))
+                except ValueError:
+                    length = -1
+                if not 0 <= length <= MAX_BODY_SIZE:
+                    await self.respond(writer, 413 if length > 0 else 400, {'error': '请求体长度无效'}, False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                self.requests += 1
+                try:
+                    status, payload = await self.dispatch(method, target, body)
+                except HttpError as e:
+                    status, payload = e.status, {'error': e.message}
+                except Exception as e:
+                    print(f'处理请求失败 {method} {target}: {str(e)}')
+                    status, payload = 500, {'error': '服务器内部错误'}
+                await self.respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer, status, payload, keep_alive):
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        head = (f'HTTP/1.1 {status} {REASONS[status]}\r\n'
+                f'Content-Type: application/json; charset=utf-8\r\n'
+                f'Content-Length: {len(data)}\r\n')
+        if not keep_alive:
+            head += 'Connection: close\r\n'
+        writer.write(head.encode('latin-1') + b'\r\n' + data)
+        await writer.drain()
+
+    async def close(self):
+        """写入剩余的喝水记录并关闭数据库"""
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f'写入喝水记录失败，{len(self.pending_events)} 条记录未保存: {str(e)}')
+        await self.run_io(self.store.close)
+        self.executor.shutdown()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None, ready=None):
+        """启动服务直到收到 SIGTERM/SIGINT；ready 为回调，参数是实际监听的地址"""
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle_connection, unix_path)
+            address = unix_path
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+            address = '%s:%d' % server.sockets[0].getsockname()[:2]
+        tasks = [asyncio.create_task(self.run_reminders()), asyncio.create_task(self.run_flusher())]
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, stop.set)
+            except (NotImplementedError, RuntimeError):
+                # Windows 不支持，Ctrl+C 时由 asyncio.run 取消任务
+                pass
+        if ready is not None:
+            ready(address)
+        try:
+            async with server:
+                await stop.wait()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await self.close()
+            if unix_path and os.path.exists(unix_path):
+                os.remove(unix_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='多用户喝水提醒服务')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix', help='监听Unix套接字而不是TCP端口')
+    parser.add_argument('--data-dir', default=os.path.dirname(os.path.abspath(__file__)))
+    args = parser.parse_args(argv)
+
+    server = WaterServer(args.data_dir)
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.unix,
+                                 ready=lambda address: print(f'喝水提醒服务已启动: {address}', flush=True)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,107 @@
+import os
+import re
+import sys
+import socket
+import getpass
+
+# 单实例通道：正在运行的程序用 QLocalServer 监听一个按用户命名的本地套接字(Windows上是命名管道)，
+# 再次启动时只需尝试连接它，连接成功即说明已有实例，并把命令转交给它。
+# 协议为一行UTF-8文本命令(如 "show"、"drink 250")，服务端回复一行 "ok ..." 或 "error ..."。
+# 这里的客户端只用标准库实现，不需要导入Qt。
+
+SERVER_PREFIX = 'WaterReminder'
+
+
+def instance_name():
+    """按当前用户区分的服务名，同一台机器上的不同用户互不影响"""
+    try:
+        user = getpass.getuser()
+    except Exception:
+        user = 'default'
+    return f'{SERVER_PREFIX}-' + re.sub(r'[^0-9A-Za-z_.-]', '_', user)
+
+
+def socket_path(name=None):
+    """与 QLocalServer 使用的地址一致：Windows为命名管道，其他系统为临时目录下的套接字文件"""
+    name = name or instance_name()
+    if sys.platform == 'win32':
+        return r'\\.\pipe' + '\\' + name
+    # QDir::tempPath() 在Unix上取 TMPDIR，未设置时为 /tmp
+    temp_dir = os.environ.get('TMPDIR') or '/tmp'
+    return os.path.join(temp_dir.rstrip('/') or '/', name)
+
+
+# send_command 的返回值：有实例在监听，但没有在超时前回复(还在启动、正在处理其他请求或管道忙)。
+# 这时不能当作没有运行，否则会启动第二个实例或绕过它直接写喝水记录
+BUSY = object()
+
+
+def send_command(command, name=None, timeout=2.0):
+    """把命令发给正在运行的实例并返回其回复
+
+    没有实例在监听时返回 None；有实例但超时未回复或无法连接时返回 BUSY。
+    """
+    path = socket_path(name)
+    payload = (command.strip() + '\n').encode('utf-8')
+    if sys.platform == 'win32':
+        return _send_pipe(path, payload, timeout)
+
+    if not os.path.exists(path):
+        return None
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(timeout)
+    try:
+        client.connect(path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        # 套接字文件残留但没有进程在监听
+        client.close()
+        return None
+    except OSError:
+        client.close()
+        return BUSY
+    try:
+        client.sendall(payload)
+        return _read_reply(client.recv)
+    except OSError:
+        # 包括超时：连接已建立，说明实例存在但没有及时回复
+        return BUSY
+    finally:
+        client.close()
+
+
+def _send_pipe(path, payload, timeout):
+    """Windows 命名管道客户端；同步读取无法设置超时，放在守护线程中执行，最多等待 timeout 秒"""
+    import threading
+    try:
+        pipe = open(path, 'r+b', buffering=0)
+    except FileNotFoundError:
+        return None
+    except OSError:
+        # ERROR_PIPE_BUSY 等：管道存在，只是暂时无法连接
+        return BUSY
+    replies = []
+
+    def exchange():
+        try:
+            pipe.write(payload)
+            replies.append(_read_reply(pipe.read))
+        except OSError:
+            pass
+        finally:
+            pipe.close()
+
+    thread = threading.Thread(target=exchange, name='instance-client', daemon=True)
+    thread.start()
+    thread.join(timeout)
+    # 超时后阻塞的读取留给守护线程，实例回复或退出时它才会结束
+    return replies[0] if replies else BUSY
+
+
+def _read_reply(read):
+    data = b''
+    while not data.endswith(b'\n'):
+        chunk = read(1024)
+        if not chunk:
+            break
+        data += chunk
+    return data.decode('utf-8', errors='replace').strip()
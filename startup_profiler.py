@@ -0,0 +1,88 @@
+import sys
+import time
+import builtins
+from contextlib import contextmanager
+
+
+class StartupProfiler:
+    """启动耗时分析(--profile-startup)
+
+    记录每个启动阶段的耗时，以及每个模块首次导入的耗时(不含其内部导入的其他模块)。
+    未启用时所有方法都是空操作，不会替换 __import__。
+    """
+
+    def __init__(self, enabled=False, started=None):
+        self.enabled = enabled
+        self.started = time.perf_counter() if started is None else started
+        self.phases = []
+        self.marks = []
+        self.imports = {}
+        self._import_stack = []
+        self._original_import = None
+        if enabled:
+            self._original_import = builtins.__import__
+            builtins.__import__ = self._timed_import
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        # 只统计首次导入，已在 sys.modules 中的模块直接交给原始实现
+        if level != 0 or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+        frame = [name, time.perf_counter(), 0.0]
+        self._import_stack.append(frame)
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            self._import_stack.pop()
+            elapsed = time.perf_counter() - frame[1]
+            self.imports[name] = self.imports.get(name, 0.0) + elapsed - frame[2]
+            if self._import_stack:
+                self._import_stack[-1][2] += elapsed
+
+    def elapsed(self):
+        """距离进程开始执行 main.py 的秒数"""
+        return time.perf_counter() - self.started
+
+    @contextmanager
+    def phase(self, name):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def mark(self, name):
+        """记录一个里程碑(如托盘就绪)距启动的时间"""
+        if self.enabled:
+            self.marks.append((name, self.elapsed()))
+
+    def stop(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def report(self, top=15, stream=None):
+        """停止统计并输出报告，同时以字典形式返回结果"""
+        if not self.enabled:
+            return None
+        self.mark('首次事件循环')
+        self.stop()
+        stream = stream or sys.stdout
+        result = {
+            'phases_ms': {name: round(seconds * 1000, 2) for name, seconds in self.phases},
+            'marks_ms': {name: round(seconds * 1000, 2) for name, seconds in self.marks},
+            'imports_ms': {name: round(seconds * 1000, 2)
+                           for name, seconds in sorted(self.imports.items(), key=lambda item: -item[1])},
+        }
+        print('===== 启动耗时 =====', file=stream)
+        for name, seconds in self.phases:
+            print(f'  阶段 {name:<16} {seconds * 1000:8.1f} ms', file=stream)
+        for name, seconds in self.marks:
+            print(f'  {name:<19} {seconds * 1000:8.1f} ms (自启动)', file=stream)
+        print(f'----- 导入耗时前{top}名(不含子模块) -----', file=stream)
+        for name, ms in list(result['imports_ms'].items())[:top]:
+            print(f'  {name:<30} {ms:8.1f} ms', file=stream)
+        stream.flush()
+        return result
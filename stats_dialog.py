@@ -0,0 +1,83 @@
+from PySide6.QtWidgets import QDialog, QLabel, QGridLayout, QVBoxLayout, QWidget
+from PySide6.QtGui import QPainter, QBrush, QColor, QFont
+from PySide6.QtCore import Qt, QRectF
+
+
+class HourlyChart(QWidget):
+    """24小时喝水量柱状图"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.hourly = [0] * 24
+        self.setMinimumSize(360, 140)
+        self._bar_brush = QBrush(QColor(51, 153, 255, 180))
+        self._label_font = QFont("SimHei", 8)
+
+    def set_hourly(self, hourly):
+        self.hourly = list(hourly)
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setFont(self._label_font)
+        width = self.width()
+        chart_height = self.height() - 16
+        bar_width = width / 24
+        peak = max(self.hourly) or 1
+
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(self._bar_brush)
+        for hour, ml in enumerate(self.hourly):
+            bar_height = chart_height * ml / peak
+            painter.drawRect(QRectF(hour * bar_width + 1, chart_height - bar_height, bar_width - 2, bar_height))
+
+        painter.setPen(Qt.black)
+        for hour in range(0, 24, 3):
+            painter.drawText(QRectF(hour * bar_width, chart_height, bar_width * 3, 16), Qt.AlignLeft, str(hour))
+
+
+class StatsDialog(QDialog):
+    """非模态的喝水统计窗口，数据由I/O线程计算好后通过 set_stats 填入"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("喝水统计")
+        self.setFont(QFont("SimHei", 10))
+
+        layout = QVBoxLayout(self)
+        grid = QGridLayout()
+        self.values = {}
+        rows = (
+            ('avg_7', '近7天日均'),
+            ('avg_30', '近30天日均'),
+            ('current_streak', '当前连续达标'),
+            ('longest_streak', '最长连续达标'),
+            ('hit_rate_30', '近30天达标率'),
+            ('hit_rate_all', '累计达标率'),
+            ('total', '累计喝水量'),
+        )
+        for row, (key, title) in enumerate(rows):
+            grid.addWidget(QLabel(title + ':'), row, 0)
+            value = QLabel('加载中...')
+            grid.addWidget(value, row, 1)
+            self.values[key] = value
+        layout.addLayout(grid)
+
+        layout.addWidget(QLabel('各时段喝水量:'))
+        self.chart = HourlyChart()
+        layout.addWidget(self.chart)
+
+        self.footer = QLabel()
+        self.footer.setAlignment(Qt.AlignRight)
+        layout.addWidget(self.footer)
+
+    def set_stats(self, stats):
+        self.values['avg_7'].setText(f"{stats['avg_7']:.0f}ml")
+        self.values['avg_30'].setText(f"{stats['avg_30']:.0f}ml")
+        self.values['current_streak'].setText(f"{stats['current_streak']}天")
+        self.values['longest_streak'].setText(f"{stats['longest_streak']}天")
+        self.values['hit_rate_30'].setText(f"{stats['hit_rate_30']:.0%}")
+        self.values['hit_rate_all'].setText(f"{stats['hit_rate_all']:.0%}")
+        self.values['total'].setText(f"{stats['total']}ml")
+        self.chart.set_hourly(stats['hourly'])
+        self.footer.setText(f"共 {stats['days']} 天 / {stats['events']} 条记录，计算耗时 {stats['elapsed_ms']:.1f}ms")
@@ -0,0 +1,196 @@
+"""通过共享文件夹(网盘、NAS等)在多台电脑之间同步喝水记录
+
+每台设备有一个随机生成的设备ID(程序目录下的 device_id 文件)，本机记录的每条事件在存储中都有递增的序号。
+同步时把上次发布之后的新事件写成共享文件夹中该设备目录下的一个增量文件：
+
+    <共享文件夹>/<设备ID>/<起始序号>-<结束序号>.jsonl
+
+起始序号是上一个增量文件的结束序号(不含)，结束序号是文件中最大的序号(含)。每个目录只有它所属的设备写入，
+网盘软件不会遇到多台设备修改同一个文件的冲突。存储中保存了每台其他设备已合并的最大序号(版本向量)，
+拉取时只按文件名挑出还没有合并的增量文件来读；文件名接不上(网盘还没同步到中间的文件)时先停下，下次从缺口处继续。
+
+每天的总量是所有设备在这一天的事件之和，相当于按天的PN计数器：每条事件只属于一台设备，按 (设备, 序号)
+最多合并一次，因此合并的顺序和次数都不影响结果，各设备最终得到相同的每日总量。
+通过导出文件导入到另一台设备上的事件会以那台设备的身份再发布一次，合并时与已有的其他来源的事件按
+(时间戳, 水量) 去重，同一条记录的多份副本只计算一次(按天合并导入的差额和迁移的按天总量不发布)。
+发布和拉取的开销只与新事件数和增量文件数有关，与历史总长度无关。增量文件多于 MAX_DELTA_FILES 个时，
+把较新的小文件合并起来，使文件大小从旧到新递减，文件数保持在历史长度的对数级别。
+共享文件夹可以是任意本地目录，测试和性能测试用临时目录代替网盘。
+"""
+import os
+import json
+import uuid
+
+from fileio import atomic_open, atomic_write_bytes
+from metrics import metrics
+
+DEVICE_ID_NAME = 'device_id'
+DELTA_SUFFIX = '.jsonl'
+# 一台设备的增量文件多于这个数时合并
+MAX_DELTA_FILES = 16
+DEFAULT_SYNC_INTERVAL = 5
+# 不发布的本机事件来源：按天合并导入时补的差额和从旧版按天总量迁移的记录只是本机的调整，
+# 其他设备各自有自己的总量，发布出去会被重复计算
+LOCAL_ONLY_SOURCES = ('import', 'migrated')
+
+
+def load_device_id(directory):
+    """读取本机的设备ID，第一次使用时生成并保存"""
+    path = os.path.join(directory, DEVICE_ID_NAME)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            device_id = f.read().strip()
+        if device_id:
+            return device_id
+    except FileNotFoundError:
+        pass
+    device_id = uuid.uuid4().hex[:16]
+    atomic_write_bytes(path, device_id.encode('ascii'))
+    return device_id
+
+
+def sync_folder_path(config, base):
+    """配置中的 sync_dir 转换为绝对路径(相对路径相对于 base)，未设置时返回 None"""
+    path = config.get('sync_dir') or ''
+    if not path:
+        return None
+    return os.path.abspath(os.path.join(base, os.path.expanduser(path)))
+
+
+def _parse_name(name):
+    """增量文件名 -> (起始序号, 结束序号)；写入中的临时文件和网盘生成的冲突副本等返回 None"""
+    if not name.endswith(DELTA_SUFFIX):
+        return None
+    after, _, last = name[:-len(DELTA_SUFFIX)].partition('-')
+    if not after.isdigit() or not last.isdigit():
+        return None
+    return int(after), int(last)
+
+
+def read_delta(path):
+    """读取增量文件中的事件 (设备序号, 时间戳, 日期, 水量, 来源)"""
+    events = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            try:
+                event = json.loads(line)
+                events.append((int(event['dseq']), float(event['ts']), str(event['day']),
+                               int(event['ml']), str(event['src'])))
+            except (ValueError, KeyError, TypeError):
+                raise ValueError(f'增量文件第{line_number}行无效: {path}')
+    return events
+
+
+def write_delta(path, events):
+    with atomic_open(path, 'w', encoding='utf-8') as f:
+        for dseq, ts, day, ml, source in events:
+            event = {'dseq': dseq, 'ts': ts, 'day': day, 'ml': ml, 'src': source}
+            f.write(json.dumps(event, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+
+class SyncFolder:
+    """一个共享文件夹和本机设备ID，负责发布本机的新事件和拉取其他设备的新事件"""
+
+    def __init__(self, path, device_id):
+        self.path = path
+        self.device_id = device_id
+        self.own_dir = os.path.join(path, device_id)
+
+    def devices(self):
+        """共享文件夹中有增量目录的全部设备ID"""
+        return sorted(name for name in os.listdir(self.path)
+                      if not name.startswith('.') and os.path.isdir(os.path.join(self.path, name)))
+
+    def delta_files(self, device):
+        """某台设备的增量文件 [(起始序号, 结束序号, 路径)]，按序号排序"""
+        directory = os.path.join(self.path, device)
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return []
+        files = []
+        for name in names:
+            span = _parse_name(name)
+            if span is not None:
+                files.append((span[0], span[1], os.path.join(directory, name)))
+        return sorted(files)
+
+    def publish(self, store):
+        """把上次发布之后本机记录的事件写成一个增量文件，返回发布的事件数
+
+        来源在 LOCAL_ONLY_SOURCES 中的事件不写入文件，但文件名的序号范围包含它们，下次不会再读取。
+        """
+        files = self.delta_files(self.device_id)
+        published = max((last for _, last, _ in files), default=0)
+        events = store.local_events_after(published)
+        if not events:
+            return 0
+        last = events[-1][0]
+        events = [event for event in events if event[4] not in LOCAL_ONLY_SOURCES]
+        os.makedirs(self.own_dir, exist_ok=True)
+        write_delta(os.path.join(self.own_dir, f'{published:012d}-{last:012d}{DELTA_SUFFIX}'), events)
+        if len(files) + 1 > MAX_DELTA_FILES:
+            self.compact(self.delta_files(self.device_id))
+        return len(events)
+
+    def compact(self, files):
+        """合并本机较新的增量文件
+
+        从最旧的文件开始，保留比所有更新的文件加起来还大的文件，把其余较新的文件合并成一个。
+        每条事件只在更新的数据超过它所在文件的大小时才会被再次重写，重写次数是对数级别的。
+        其他设备在合并过程中读到新旧文件同时存在也没有关系，重复的事件按序号跳过。
+        """
+        sizes = [os.path.getsize(path) for _, _, path in files]
+        start = 0
+        while start < len(files) - 1 and sizes[start] >= sum(sizes[start + 1:]):
+            start += 1
+        merged = files[start:]
+        if len(merged) < 2:
+            return
+        events = []
+        for _, _, path in merged:
+            events.extend(read_delta(path))
+        # 先写入合并后的文件再删除旧文件，中途出错时只会多出重复的事件
+        write_delta(os.path.join(self.own_dir, f'{merged[0][0]:012d}-{merged[-1][1]:012d}{DELTA_SUFFIX}'), events)
+        for _, _, path in merged:
+            os.remove(path)
+
+    def pull(self, store):
+        """合并其他设备尚未合并的增量文件，返回 (事件数, {日期: 增加的水量})"""
+        vector = store.version_vector()
+        pulled = 0
+        days = {}
+        for device in self.devices():
+            if device == self.device_id:
+                continue
+            merged = vector.get(device, 0)
+            for after, last, path in self.delta_files(device):
+                if last <= merged:
+                    continue
+                if after > merged:
+                    # 中间的增量文件还没有出现在共享文件夹中
+                    break
+                try:
+                    events = read_delta(path)
+                except FileNotFoundError:
+                    # 文件刚被那台设备合并掉，下次同步时读取合并后的文件
+                    break
+                except ValueError as e:
+                    print(f'跳过设备 {device} 的同步: {str(e)}')
+                    break
+                pulled += sum(1 for event in events if event[0] > merged)
+                for day, ml in store.append_remote(device, events).items():
+                    days[day] = days.get(day, 0) + ml
+                merged = last
+        return pulled, days
+
+    def sync(self, store):
+        """先发布本机的新事件再拉取其他设备的新事件，返回 {'pushed', 'pulled', 'days'}"""
+        if not os.path.isdir(self.path):
+            # 网络盘未连接时不在本地创建同名目录
+            raise FileNotFoundError(f'同步文件夹不存在: {self.path}')
+        pushed = self.publish(store)
+        pulled, days = self.pull(store)
+        metrics.count('sync_events_total', pushed, direction='push')
+        metrics.count('sync_events_total', pulled, direction='pull')
+        return {'pushed': pushed, 'pulled': pulled, 'days': days}
@@ -0,0 +1,791 @@
+import os
+import sys
+import time
+import gc
+import json
+import datetime
+import threading
+
+from PySide6.QtWidgets import QApplication, QMenu, QSystemTrayIcon
+from PySide6.QtGui import QAction, QIcon, QPixmap
+from PySide6.QtCore import QFileSystemWatcher, QObject, Qt, QTimer, Signal
+
+from history_store import open_history_store, DEFAULT_HISTORY_BACKEND
+from scheduler import ReminderScheduler
+from core import WaterCore, DEFAULT_CONFIG, parse_amounts
+from config import ConfigFile, CONFIG_NAME, APP_DIR
+from metrics import metrics, ENV_ENABLED
+from fileio import atomic_write_bytes, atomic_write_json
+from platform_support import get_platform, current_rss, trim_memory
+from notifier import Notifier
+from io_worker import IOWorker
+
+REMINDER_KEY = 'water'
+# 喝水记录写入前等待的秒数，期间的多次记录合并为一次写入
+SAVE_DELAY = 0.5
+# 写入喝水记录失败后重试的等待秒数，每次失败加倍，最长 SAVE_RETRY_MAX 秒
+SAVE_RETRY_MIN = 5
+SAVE_RETRY_MAX = 300
+# 配置文件变化后等待的秒数，编辑器保存时的多次写入只重新加载一次
+CONFIG_RELOAD_DELAY = 0.2
+# 本机记录喝水后等待的秒数再同步，期间的多次记录只同步一次
+SYNC_DELAY = 10
+METRICS_JSON_NAME = 'metrics_snapshot.json'
+METRICS_TEXT_NAME = 'metrics.prom'
+
+
+class WaterReminderTray(QObject):
+    """托盘常驻部分：持有配置、今日喝水量和提醒定时器
+
+    喝水量的计算规则在与界面无关的 WaterCore 中，这里负责把它接到托盘、通知和I/O线程上。
+    启动时先显示托盘图标，主窗口(main_window)和各类对话框在第一次需要时才导入和创建；
+    关闭主窗口时整个窗口被销毁(lean_resident)，常驻期间只保留托盘、调度器和 core。
+    配置、喝水记录和注册表的读写全部交给 IOWorker 线程，GUI线程从不等待磁盘；
+    在配置加载完成前先使用默认配置，之后监视 config.json，修改后不需要重启即可生效。
+    设置了 sync_dir 时定时、以及本机记录喝水之后与共享文件夹交换增量(见 sync.py)。
+    """
+
+    # 今日喝水量、配置或下一次提醒时间变化时发出，主窗口据此刷新
+    state_changed = Signal()
+
+    def __init__(self):
+        super().__init__()
+        self.window = None
+        self.tray_icon = None
+        self.io = IOWorker(self)
+        # 开机自启动和系统通知的实现按操作系统选择
+        self.platform = get_platform()
+        self.icon_path = self.find_icon()
+        self.icon = self.load_icon()
+
+        # 配置在I/O线程中加载，完成前使用默认配置；config_file 只在I/O线程中使用
+        self.config_file = ConfigFile(os.path.join(APP_DIR, CONFIG_NAME))
+        self.config_watcher = None
+        self.config = dict(DEFAULT_CONFIG)
+        # 今日喝水量和每日上限等状态
+        self.core = WaterCore(self.config)
+        # history 只在I/O线程中使用；打开失败时 history_error 保存原因，此时不再记录喝水
+        self.history = None
+        self.history_error = None
+        self.pending_events = []
+        self.pending_lock = threading.Lock()
+        # 写入失败后等待重试的秒数，0 表示上一次写入成功
+        self.save_retry_delay = 0
+        self.save_retry_timer = None
+        self.scheduler = None
+        self.next_reminder = None
+        self.username = None
+        self.stats_dialog = None
+        self.metrics_server = None
+        self.metrics_port = 0
+        # 预期提醒定时器触发的单调时钟时间，用于统计定时器误差
+        self.timer_expected = None
+        # 最近一次释放主窗口前后的常驻内存(字节)
+        self.last_release_rss = None
+        # 同步文件夹的绝对路径，未设置时为 None；device_id 只在I/O线程中使用
+        self.sync_dir = None
+        self.device_id = None
+        self.sync_timer = None
+        self.sync_soon_timer = None
+
+        # 初始化系统托盘
+        self.init_system_tray()
+        self.notifier = Notifier(self.icon, self.tray_icon, self, self.platform, self.icon_path)
+
+    @property
+    def today(self):
+        return self.core.today
+
+    @property
+    def today_drunk(self):
+        return self.core.today_drunk
+
+    @property
+    def daily_limit(self):
+        return self.core.daily_limit
+
+    @property
+    def drink_amount(self):
+        return self.core.drink_amount
+
+    @property
+    def recording_enabled(self):
+        return self.history_error is None
+
+    def start(self):
+        """托盘显示之后在后台加载配置和喝水记录，并设置定时提醒"""
+        self.io.submit('load-state', self.load_state, self.today, callback=self.on_state_loaded)
+
+        self.scheduler = ReminderScheduler()
+        self.scheduler.add(REMINDER_KEY, self.core.reminder_interval, self.core.quiet_hours)
+
+        # 所有提醒共用一个单次定时器，每次只等待调度器中最早的时间点
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.on_reminder_timer)
+        self.set_reminder()
+
+        # 定时同步，以及本机记录之后延迟 SYNC_DELAY 秒的同步；没有设置同步文件夹时都不启动
+        self.sync_timer = QTimer(self)
+        self.sync_timer.timeout.connect(self.sync_history)
+        self.sync_soon_timer = QTimer(self)
+        self.sync_soon_timer.setSingleShot(True)
+        self.sync_soon_timer.setInterval(SYNC_DELAY * 1000)
+        self.sync_soon_timer.timeout.connect(self.sync_history)
+
+        # 写入喝水记录失败后的重试
+        self.save_retry_timer = QTimer(self)
+        self.save_retry_timer.setSingleShot(True)
+        self.save_retry_timer.timeout.connect(self.retry_save)
+
+    def find_icon(self):
+        """ico目录下的icon.ico，先在当前目录查找，再在程序目录查找(开机自启动时当前目录不一定是程序目录)"""
+        relative = os.path.join('ico', 'icon.ico')
+        icon_path = os.path.abspath(relative)
+        if not os.path.exists(icon_path) and os.path.exists(os.path.join(APP_DIR, relative)):
+            return os.path.join(APP_DIR, relative)
+        return icon_path
+
+    def load_icon(self):
+        """加载程序图标，失败时使用红色备用图标"""
+        icon_path = self.icon_path
+
+        # 检查图标文件是否存在
+        if not os.path.exists(icon_path):
+            from PySide6.QtWidgets import QMessageBox
+            QMessageBox.critical(None, '错误', f'图标文件不存在: {icon_path}')
+        else:
+            # 尝试加载图标
+            icon = QIcon(icon_path)
+            if not icon.isNull():
+                return icon
+            from PySide6.QtWidgets import QMessageBox
+            QMessageBox.critical(None, '错误', f'无法加载图标文件: {icon_path}')
+
+        # 创建一个红色图标作为备用
+        pixmap = QPixmap(32, 32)
+        pixmap.fill(Qt.red)
+        return QIcon(pixmap)
+
+    def load_state(self, today):
+        """在I/O线程中加载配置、打开喝水记录存储并读取当天总量和当天的逐条事件
+
+        存储打开失败(例如另一个程序正在使用事件日志、文件损坏)时返回失败原因，而不是抛出异常让回调不被调用。
+        """
+        config, _ = self.config_file.load()
+        history = None
+        try:
+            history = open_history_store(APP_DIR, config.get('history_backend', DEFAULT_HISTORY_BACKEND))
+            stored_total, day_events = history.day_total(today), history.day_events(today)
+        except Exception as e:
+            if history is not None:
+                history.close()
+            return config, today, 0, [], str(e) or type(e).__name__
+        self.history = history
+        return config, today, stored_total, day_events, None
+
+    def on_state_loaded(self, state):
+        config, day, stored_total, day_events, error = state
+        self.apply_config(config)
+        if error is None:
+            # 加载完成前记录的喝水量已经作为事件排在加载之后写入，这里只需加上已保存的部分
+            self.core.add_stored(day, stored_total)
+            self.core.restore_events(day, day_events)
+        else:
+            self.history_error = error
+            print(f'无法加载喝水记录: {error}')
+            self.notifier.notify('无法加载喝水记录', f'{error}\n已停止记录喝水，请处理后重新启动程序')
+        self.state_changed.emit()
+        self.watch_config()
+
+    def check_recording(self):
+        """喝水记录没有加载成功时提示并返回 False，记录、撤销和清空前调用"""
+        if self.history_error is None:
+            return True
+        self.notifier.notify('无法记录喝水', f'喝水记录没有加载成功: {self.history_error}')
+        return False
+
+    def watch_config(self):
+        """监视配置文件；同时监视所在目录，以便发现编辑器先删除再重建文件的保存方式"""
+        self.config_watcher = QFileSystemWatcher(self)
+        self.config_watcher.addPath(APP_DIR)
+        if os.path.exists(self.config_file.path):
+            self.config_watcher.addPath(self.config_file.path)
+        self.config_watcher.fileChanged.connect(self.on_config_file_changed)
+        self.config_watcher.directoryChanged.connect(self.on_config_file_changed)
+
+    def on_config_file_changed(self, path):
+        # 文件被替换后监视会失效，需要重新添加
+        config_path = self.config_file.path
+        if config_path not in self.config_watcher.files() and os.path.exists(config_path):
+            self.config_watcher.addPath(config_path)
+        self.io.submit('reload-config', self.config_file.load, callback=self.on_config_reloaded,
+                       delay=CONFIG_RELOAD_DELAY)
+
+    def on_config_reloaded(self, result):
+        config, changed = result
+        if not changed:
+            return
+        if config.get('history_backend') != self.config.get('history_backend'):
+            print('history_backend 的修改需要重启程序后生效')
+        self.apply_config(config)
+
+    def apply_config(self, config):
+        """使用新的配置更新界面文字和提醒间隔"""
+        self.config = config
+        self.core.apply_config(config)
+        self.apply_metrics_config(config)
+        self.apply_sync_config(config)
+        if self.tray_icon is not None:
+            self.quick_drink_action.setText(f'快捷喝水({self.drink_amount}ml)')
+        if self.scheduler is not None:
+            self.scheduler.update(REMINDER_KEY, self.core.reminder_interval, self.core.quiet_hours)
+            self.set_reminder()
+        self.state_changed.emit()
+
+    def apply_metrics_config(self, config):
+        """按配置开启或关闭性能统计，以及本机的指标HTTP接口"""
+        metrics.set_enabled(config.get('metrics', False) or ENV_ENABLED)
+        if self.tray_icon is not None:
+            self.metrics_action.setVisible(metrics.enabled)
+        port = config.get('metrics_port', 0) if metrics.enabled else 0
+        if port == self.metrics_port:
+            return
+        if self.metrics_server is not None:
+            self.metrics_server.close()
+            self.metrics_server = None
+        self.metrics_port = port
+        if port:
+            from metrics_server import MetricsServer
+            self.metrics_server = MetricsServer(self)
+            if not self.metrics_server.listen(port):
+                print(f'指标接口无法监听端口 {port}')
+
+    def apply_sync_config(self, config):
+        """按配置开启或关闭定时同步，同步文件夹改变(包括第一次加载配置)时立即同步一次"""
+        if self.sync_timer is None:
+            return
+        sync_dir = None
+        if config.get('sync_dir'):
+            from sync import sync_folder_path, DEFAULT_SYNC_INTERVAL
+            sync_dir = sync_folder_path(config, APP_DIR)
+            interval = config.get('sync_interval', DEFAULT_SYNC_INTERVAL) * 60 * 1000
+            if not self.sync_timer.isActive() or self.sync_timer.interval() != interval:
+                self.sync_timer.start(interval)
+        else:
+            self.sync_timer.stop()
+            self.sync_soon_timer.stop()
+        if self.tray_icon is not None:
+            self.sync_action.setVisible(sync_dir is not None)
+        changed = sync_dir != self.sync_dir
+        self.sync_dir = sync_dir
+        if changed and sync_dir is not None:
+            self.sync_history()
+
+    def sync_history(self, path=None, reply=None):
+        """与同步文件夹交换增量，文件读写在I/O线程中进行；reply 不为 None 时接收一行回复文本"""
+        path = path or self.sync_dir
+        if path is None:
+            if reply is not None:
+                reply('error 没有设置同步文件夹(sync_dir)')
+            return
+        if self.history_error is not None:
+            if reply is not None:
+                reply(f'error 喝水记录没有加载成功: {self.history_error}')
+            return
+        self.sync_soon_timer.stop()
+        # 定时和记录之后触发的同步在队列中合并，需要回复的请求各自执行
+        self.io.submit(None if reply else 'sync', self.exchange_history, path,
+                       callback=lambda result: self.on_history_merged(result, reply))
+
+    def exchange_history(self, path):
+        """在I/O线程中发布本机的新记录并合并其他设备的新记录，返回 (回复文本, 各天增加的水量)"""
+        from sync import SyncFolder, load_device_id
+        if not self.history.has_events:
+            return 'error 当前的存储后端不保存逐条记录，无法同步，请使用 eventlog 或 sqlite', {}
+        try:
+            if self.device_id is None:
+                self.device_id = load_device_id(APP_DIR)
+            result = SyncFolder(path, self.device_id).sync(self.history)
+        except (OSError, ValueError) as e:
+            return f'error {str(e)}', {}
+        days = result.pop('days')
+        metrics.count('history_events_written_total', result['pulled'])
+        return 'ok ' + json.dumps(result), days
+
+    def sync_now(self):
+        """托盘菜单中的立即同步，完成后显示通知"""
+        self.sync_history(reply=self.on_manual_sync)
+
+    def on_manual_sync(self, text):
+        status, _, detail = text.partition(' ')
+        if status != 'ok':
+            self.notifier.notify('同步失败', detail)
+            return
+        result = json.loads(detail)
+        self.notifier.notify('同步完成', f'发送 {result["pushed"]} 条，接收 {result["pulled"]} 条喝水记录')
+
+    def export_metrics(self):
+        """把当前的性能统计写入程序目录，文件在I/O线程中写入"""
+        self.io.submit('export-metrics', self.write_metrics_files, metrics.snapshot(), metrics.prometheus_text(),
+                       callback=self.on_metrics_exported)
+
+    def write_metrics_files(self, snapshot, text):
+        json_path = os.path.join(APP_DIR, METRICS_JSON_NAME)
+        atomic_write_json(json_path, snapshot)
+        atomic_write_bytes(os.path.join(APP_DIR, METRICS_TEXT_NAME), text.encode('utf-8'))
+        return json_path
+
+    def on_metrics_exported(self, path):
+        self.notifier.notify('操作成功', f'性能数据已导出到 {path}')
+
+    def save_drinking_history(self, delta, source='button'):
+        """把一条喝水事件交给I/O线程写入
+
+        短时间内的多次记录会在队列中合并成一次 append_many 写入。
+        """
+        if not delta:
+            return
+        with self.pending_lock:
+            self.pending_events.append((delta, source, time.time(), str(self.today)))
+        self.io.submit('save-history', self.flush_pending_events, delay=SAVE_DELAY, callback=self.on_history_flushed)
+        # 不把延迟交给I/O线程：延迟中的队首任务会挡住后面的任务
+        if self.sync_dir is not None and not self.sync_soon_timer.isActive():
+            self.sync_soon_timer.start()
+
+    def flush_pending_events(self):
+        """在I/O线程中写入所有待保存的喝水事件，返回失败原因，成功或没有事件时返回 None"""
+        with self.pending_lock:
+            events, self.pending_events = self.pending_events, []
+        if not events:
+            return None
+        try:
+            self.history.append_many(events)
+        except Exception as e:
+            # 写入失败时放回队列前面，稍后重试，不丢弃已经计入今日喝水量的记录
+            with self.pending_lock:
+                self.pending_events[:0] = events
+            return str(e) or type(e).__name__
+        metrics.count('history_events_written_total', len(events))
+        return None
+
+    def on_history_flushed(self, error):
+        """写入失败时按指数退避安排重试，第一次失败时提示用户；喝水记录没有加载成功时不重试"""
+        if error is None:
+            self.save_retry_delay = 0
+            return
+        if self.history_error is not None:
+            return
+        if not self.save_retry_delay:
+            self.notifier.notify('保存失败', f'喝水记录暂时无法保存，稍后会自动重试: {error}')
+        self.save_retry_delay = min(max(self.save_retry_delay * 2, SAVE_RETRY_MIN), SAVE_RETRY_MAX)
+        print(f'保存喝水记录失败，{self.save_retry_delay}秒后重试: {error}')
+        self.save_retry_timer.start(self.save_retry_delay * 1000)
+
+    def retry_save(self):
+        self.io.submit('save-history', self.flush_pending_events, callback=self.on_history_flushed)
+
+    def show_stats(self):
+        """打开统计窗口，统计数据在I/O线程中加载和计算"""
+        if self.history_error is not None:
+            self.notifier.notify('无法统计', f'喝水记录没有加载成功: {self.history_error}')
+            return
+        with metrics.timed('ui_action_seconds', action='show_stats'):
+            if self.stats_dialog is None:
+                from stats_dialog import StatsDialog
+                self.stats_dialog = StatsDialog(self.window)
+            self.stats_dialog.show()
+            self.stats_dialog.raise_()
+            self.stats_dialog.activateWindow()
+        self.io.submit('stats', self.compute_stats, self.daily_limit, callback=self.on_stats_computed)
+
+    def on_stats_computed(self, stats):
+        # 计算期间统计窗口可能已随主窗口一起释放
+        if self.stats_dialog is not None:
+            self.stats_dialog.set_stats(stats)
+
+    def compute_stats(self, goal):
+        """在I/O线程中把全部历史加载为列式结构并计算统计指标"""
+        from analytics import DrinkHistory, summarize
+        return summarize(DrinkHistory.from_store(self.history), goal)
+
+    def show_window(self):
+        """显示主窗口，第一次调用时才导入并创建"""
+        with metrics.timed('ui_action_seconds', action='show_window'):
+            if self.window is None:
+                from main_window import WaterReminderApp
+                self.window = WaterReminderApp(self)
+            self.window.showNormal()
+            self.window.activateWindow()
+
+    def release_window(self):
+        """关闭主窗口：默认销毁窗口及其子控件(包括统计窗口)，下次显示时重新创建"""
+        window = self.window
+        if window is None:
+            return
+        if not self.config.get('lean_resident', True):
+            window.hide()
+            return
+        self.window = None
+        self.stats_dialog = None
+        rss_before = current_rss()
+        self.state_changed.disconnect(window.refresh)
+        window.hide()
+        # C++对象在回到事件循环后才真正删除，删除后再测量内存
+        window.destroyed.connect(lambda: QTimer.singleShot(0, lambda: self.on_window_released(rss_before)))
+        window.deleteLater()
+
+    def on_window_released(self, rss_before):
+        gc.collect()
+        trim_memory()
+        rss_after = current_rss()
+        if rss_before is None or rss_after is None:
+            return
+        self.last_release_rss = (rss_before, rss_after)
+        metrics.gauge('resident_rss_bytes', rss_after)
+        print(f'主窗口已释放，常驻内存 {rss_before / 1048576:.1f}MB -> {rss_after / 1048576:.1f}MB')
+
+    def handle_command(self, command, args):
+        """处理其他进程通过单实例通道发来的命令"""
+        if command == 'show':
+            self.show_window()
+        elif command == 'drink':
+            try:
+                amounts = parse_amounts(args) if args else None
+            except ValueError as e:
+                print(f'无效的喝水命令: {str(e)}')
+                return
+            self.record_drink('ipc', amounts)
+        elif command == 'undo':
+            count = int(args[0]) if args and args[0].isdigit() else 1
+            self.undo_drinks(count)
+
+    def handle_query(self, command, args, reply):
+        """处理需要返回结果的命令(命令行的 status、export、import 和 sync)，reply 接收一行回复文本"""
+        if command == 'status':
+            if self.core.roll_over():
+                self.state_changed.emit()
+            status = self.core.status()
+            status['next_reminder'] = self.get_next_reminder_time()
+            reply('ok ' + json.dumps(status, ensure_ascii=False))
+        elif command in ('export', 'import') and self.history_error is not None:
+            reply(f'error 喝水记录没有加载成功: {self.history_error}')
+        elif command == 'export' and args:
+            # 排在尚未写入的喝水事件之后执行，导出的数据包含刚刚的记录
+            self.io.submit(None, self.export_history, ' '.join(args), callback=reply)
+        elif command == 'import' and len(args) >= 2:
+            self.io.submit(None, self.import_history, args[0], ' '.join(args[1:]),
+                           callback=lambda result: self.on_history_merged(result, reply))
+        elif command == 'sync':
+            self.sync_history(' '.join(args) or None, reply)
+        else:
+            reply('error invalid arguments')
+
+    def export_history(self, path):
+        """在I/O线程中导出喝水记录，返回回复文本"""
+        from history_io import export_history
+        try:
+            count = export_history(self.history, path)
+        except (OSError, ValueError) as e:
+            return f'error {str(e)}'
+        return 'ok ' + json.dumps({'path': path, 'count': count}, ensure_ascii=False)
+
+    def import_history(self, merge, path):
+        """在I/O线程中把导出文件合并到喝水记录，返回 (回复文本, 各天增加的水量)"""
+        from history_io import import_history
+        try:
+            result = import_history(self.history, path, merge)
+        except (OSError, ValueError) as e:
+            return f'error {str(e)}', {}
+        days = result.pop('days')
+        metrics.count('history_events_written_total', result['imported'])
+        return 'ok ' + json.dumps(result), days
+
+    def on_history_merged(self, result, reply=None):
+        """导入或同步完成：合并进来的记录中有今天的，加到今日喝水量上"""
+        text, days = result
+        added = days.get(str(self.today))
+        if added:
+            self.core.add_stored(self.today, added)
+            self.state_changed.emit()
+        if reply is not None:
+            reply(text)
+        elif text.startswith('error '):
+            print(f'同步喝水记录失败: {text[6:]}')
+
+    def get_next_reminder_time(self):
+        """获取下一次提醒时间"""
+        if self.next_reminder is None:
+            return "--:--"
+        return self.next_reminder.strftime("%H:%M")
+
+    def set_reminder(self):
+        """按调度器中最早的提醒时间重新设置定时器"""
+        # 最多休眠 MAX_SLEEP_SECONDS，醒来后由调度器检查系统休眠和时间修改
+        interval_ms = int(self.scheduler.seconds_until_next() * 1000)
+        self.timer.start(interval_ms)
+        self.timer_expected = time.monotonic() + interval_ms / 1000
+
+        # 更新状态
+        deadline = self.scheduler.deadline(REMINDER_KEY)
+        next_reminder = datetime.datetime.fromtimestamp(deadline) if deadline is not None else None
+        if next_reminder != self.next_reminder:
+            self.next_reminder = next_reminder
+            self.state_changed.emit()
+
+    def on_reminder_timer(self):
+        # 实际触发时间与预期的差值，负数表示提前触发
+        metrics.observe('reminder_timer_drift_seconds', time.monotonic() - self.timer_expected)
+        due = self.scheduler.pop_due()
+        for _, reason in due:
+            metrics.count('reminders_fired_total', reason=reason)
+        self.set_reminder()
+        if due:
+            self.show_reminder()
+
+    def show_reminder(self):
+        """显示非模态的提醒，可以直接在提示窗中记录喝水或稍后提醒"""
+        if self.username is None:
+            # 获取Windows用户名
+            import getpass
+            self.username = getpass.getuser()
+
+        # 上一个提醒还没处理时会被新的提醒替换，不会叠加
+        self.notifier.ask(
+            "喝水提醒",
+            f"{self.username}，该喝水啦！\n今日已喝水: {self.today_drunk}ml / {self.daily_limit}ml",
+            [(f"喝了{self.drink_amount}ml", lambda: self.record_drink('reminder')),
+             ("稍后提醒", self.snooze_reminder),
+             ("忽略", None)])
+
+    def snooze_reminder(self):
+        """稍后再次提醒，之后恢复按间隔提醒"""
+        self.scheduler.snooze(REMINDER_KEY, self.core.snooze_minutes)
+        self.set_reminder()
+
+    def record_drink(self, source='button', amounts=None):
+        """记录喝水量，amounts 为多次喝水的水量列表，默认记录一次单次饮水量"""
+        if not self.check_recording():
+            return
+        with metrics.timed('ui_action_seconds', action='drink'):
+            amounts = amounts or [self.drink_amount]
+            # 跨天清零和每日上限由 core 处理
+            deltas = self.core.record_many(amounts)
+
+            # 更新UI
+            self.state_changed.emit()
+
+            # 保存记录，每次喝水是一条事件
+            for delta in deltas:
+                self.save_drinking_history(delta, source)
+
+            # 显示提示，不等待用户确认
+            recorded = sum(deltas)
+            if recorded < sum(amounts):
+                self.notifier.notify("已达到每日上限", f"每日上限为{self.daily_limit}ml，本次只记录了{recorded}ml")
+            elif len(amounts) > 1:
+                self.notifier.notify("记录成功", f"已记录{len(amounts)}次共{recorded}ml饮水量")
+            else:
+                self.notifier.notify("记录成功", f"已记录{recorded}ml饮水量")
+
+    def record_drink_text(self, text, source='button'):
+        """按输入的水量(可以是空格或逗号分隔的多个)记录喝水，输入无效时提示并返回 False"""
+        try:
+            amounts = parse_amounts(text)
+        except ValueError as e:
+            self.notifier.notify("输入无效", str(e))
+            return False
+        self.record_drink(source, amounts)
+        return True
+
+    def ask_drink_amounts(self):
+        """托盘菜单：输入一个或多个水量后记录"""
+        from PySide6.QtWidgets import QInputDialog
+        with metrics.timed('modal_dialog_seconds', dialog='amounts'):
+            text, ok = QInputDialog.getText(self.window, '记录喝水', '水量(ml)，多次喝水用空格分隔:',
+                                            text=str(self.drink_amount))
+        if ok:
+            self.record_drink_text(text, 'tray')
+
+    def undo_drinks(self, count=1):
+        """撤销今天最近的 count 次喝水，每次撤销写入一条来源为 'undo' 的负数事件"""
+        if not self.check_recording():
+            return
+        with metrics.timed('ui_action_seconds', action='undo'):
+            deltas = self.core.undo(count)
+            if not deltas:
+                self.notifier.notify("无法撤销", "今天没有可以撤销的喝水记录")
+                return
+            self.state_changed.emit()
+            for delta in deltas:
+                self.save_drinking_history(delta, 'undo')
+            self.notifier.notify("撤销成功", f"已撤销{len(deltas)}次喝水，共{-sum(deltas)}ml")
+
+    def update_tray_actions(self):
+        for action in (self.quick_drink_action, self.amounts_action, self.delete_history_action):
+            action.setEnabled(self.recording_enabled)
+        self.undo_action.setEnabled(self.recording_enabled and len(self.core.events) > 0)
+
+    def init_system_tray(self):
+        # 检查系统是否支持托盘
+        if not QSystemTrayIcon.isSystemTrayAvailable():
+            return
+
+        # 创建托盘图标
+        self.tray_icon = QSystemTrayIcon(self)
+        self.tray_icon.setIcon(self.icon)
+        self.tray_icon.setToolTip('喝水提醒')
+
+        # 创建右键菜单，托盘菜单没有父窗口，由控制器持有引用
+        self.tray_menu = QMenu()
+
+        # 快捷喝水动作
+        self.quick_drink_action = QAction(f'快捷喝水({self.drink_amount}ml)', self)
+        self.quick_drink_action.triggered.connect(lambda: self.record_drink('tray'))
+        self.tray_menu.addAction(self.quick_drink_action)
+
+        # 输入其他水量或多次喝水
+        self.amounts_action = QAction('记录其他水量...', self)
+        self.amounts_action.triggered.connect(self.ask_drink_amounts)
+        self.tray_menu.addAction(self.amounts_action)
+
+        # 撤销最近一次喝水，今天没有可撤销的记录时禁用
+        self.undo_action = QAction('撤销上一次喝水', self)
+        self.undo_action.setEnabled(False)
+        self.undo_action.triggered.connect(lambda: self.undo_drinks(1))
+        self.tray_menu.addAction(self.undo_action)
+        self.state_changed.connect(self.update_tray_actions)
+
+        # 删除存档动作
+        self.delete_history_action = QAction('删除存档', self)
+        self.delete_history_action.triggered.connect(self.clear_today_history)
+        self.tray_menu.addAction(self.delete_history_action)
+
+        # 立即同步动作，只在设置了同步文件夹时显示
+        self.sync_action = QAction('立即同步', self)
+        self.sync_action.setVisible(False)
+        self.sync_action.triggered.connect(self.sync_now)
+        self.tray_menu.addAction(self.sync_action)
+
+        # 导出性能数据动作，只在开启性能统计时显示
+        self.metrics_action = QAction('导出性能数据', self)
+        self.metrics_action.setVisible(metrics.enabled)
+        self.metrics_action.triggered.connect(self.export_metrics)
+        self.tray_menu.addAction(self.metrics_action)
+
+        # 开机自启动动作，当前系统不支持时不显示
+        self.startup_action = QAction('开机自启动', self)
+        self.startup_action.setCheckable(True)
+        self.startup_action.setVisible(self.platform.supports_startup)
+        if self.platform.supports_startup:
+            self.io.submit('read-startup', self.is_startup_enabled, callback=self.startup_action.setChecked)
+        self.startup_action.triggered.connect(self.toggle_startup)
+        self.tray_menu.addAction(self.startup_action)
+
+        # 退出程序动作
+        exit_action = QAction('退出程序', self)
+        exit_action.triggered.connect(self.quit_application)
+        self.tray_menu.addAction(exit_action)
+
+        # 设置托盘菜单
+        self.tray_icon.setContextMenu(self.tray_menu)
+
+        # 连接托盘点击事件
+        self.tray_icon.activated.connect(self.on_tray_activated)
+
+        # 显示托盘图标
+        self.tray_icon.show()
+
+    def on_tray_activated(self, reason):
+        # 左键点击显示/隐藏窗口
+        if reason == QSystemTrayIcon.Trigger:
+            if self.window is not None and self.window.isVisible():
+                self.release_window()
+            else:
+                self.show_window()
+
+    def startup_command(self):
+        """开机自启动时执行的命令，自启动时直接最小化到托盘"""
+        if getattr(sys, 'frozen', False):
+            return f'"{sys.executable}" --minimized'
+        return f'"{sys.executable}" "{os.path.join(APP_DIR, "main.py")}" --minimized'
+
+    def is_startup_enabled(self):
+        # 检查是否启用了开机自启动
+        return self.platform.is_startup_enabled(self.startup_command())
+
+    def toggle_startup(self, checked):
+        # 切换开机自启动状态，注册表或文件操作在I/O线程中进行
+        self.io.submit('write-startup', self.write_startup, checked, callback=self.on_startup_written)
+
+    def write_startup(self, checked):
+        """在I/O线程中修改开机自启动设置，返回 (是否启用, 错误信息)"""
+        try:
+            self.platform.set_startup(checked, self.startup_command())
+        except OSError as e:
+            return checked, str(e)
+        return checked, None
+
+    def on_startup_written(self, result):
+        checked, error = result
+        if error is not None:
+            self.startup_action.setChecked(not checked)
+            self.notifier.notify('操作失败', f'无法修改开机自启动设置: {error}')
+        elif checked:
+            self.notifier.notify('操作成功', '已启用开机自启动')
+        else:
+            self.notifier.notify('操作成功', '已禁用开机自启动')
+
+    def quit_application(self):
+        # 退出程序
+        from PySide6.QtWidgets import QMessageBox
+        with metrics.timed('modal_dialog_seconds', dialog='quit'):
+            reply = QMessageBox.question(self.window, '确认退出', '确定要退出程序吗？',
+                                         QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        if reply == QMessageBox.Yes:
+            self.shutdown()
+
+    def shutdown(self):
+        """写完所有待保存的数据并退出事件循环"""
+        # 还有没同步出去的本机记录时，排在写入之后同步一次
+        if self.sync_soon_timer is not None and self.sync_soon_timer.isActive():
+            self.sync_soon_timer.stop()
+            self.io.submit('sync', self.exchange_history, self.sync_dir)
+        if self.save_retry_timer is not None:
+            self.save_retry_timer.stop()
+        self.io.stop()
+        # I/O线程已经停止，在这里最后同步写入一次仍在等待重试的记录
+        if self.pending_events and self.history is not None:
+            self.flush_pending_events()
+        if self.pending_events:
+            from PySide6.QtWidgets import QMessageBox
+            amount = sum(event[0] for event in self.pending_events)
+            print(f'{len(self.pending_events)} 条喝水记录未能保存')
+            QMessageBox.warning(self.window, '保存失败',
+                                f'有{len(self.pending_events)}条喝水记录(共{amount}ml)未能保存，退出后将丢失')
+        if self.history is not None:
+            self.history.close()
+        QApplication.quit()
+
+    def clear_today_history(self):
+        """清空今日喝水记录"""
+        if not self.check_recording():
+            return
+        from PySide6.QtWidgets import QMessageBox
+        # 确认对话框
+        with metrics.timed('modal_dialog_seconds', dialog='clear'):
+            reply = QMessageBox.question(self.window, '确认清空', '确定要清空今日喝水记录吗？',
+                                         QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+
+        if reply == QMessageBox.Yes:
+            # 重置今日喝水量
+            delta = self.core.clear()
+
+            # 更新UI
+            self.state_changed.emit()
+
+            # 更新历史记录
+            self.save_drinking_history(delta, 'clear')
+
+            # 显示提示
+            self.notifier.notify("操作成功", "今日喝水记录已清空")
@@ -0,0 +1,187 @@
+import time
+
+from PySide6.QtWidgets import QWidget
+from PySide6.QtGui import QPainter, QBrush, QPen, QColor, QFont, QPixmap
+from PySide6.QtCore import Qt, QRectF, QTimer
+
+from metrics import metrics
+
+# 动画帧间隔(约60帧/秒)，也是单帧绘制的时间预算
+FRAME_INTERVAL_MS = 16
+# 水位从旧值过渡到新值的总时长
+ANIMATION_MS = 400
+
+
+# 水瓶UI组件
+class WaterBottleWidget(QWidget):
+    """水瓶进度组件
+
+    瓶身轮廓和瓶颈是静态的，按(尺寸, 设备像素比)预先绘制到 QPixmap 中缓存，
+    每次重绘只需贴图并绘制水和文字；画笔、画刷和字体也只创建一次。
+
+    水量变化时水位按时间插值过渡，帧定时器只在动画进行中运行，组件隐藏时立即停止。
+    frame_stats() 返回帧数、掉帧数和绘制耗时，便于排查卡顿；掉帧数也计入性能统计的 dropped_frames_total。
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.current_water = 0
+        self.daily_limit = 3000
+        self.setMinimumSize(200, 300)
+        self.setMaximumSize(200, 300)
+
+        self._outline_pen = QPen(Qt.black, 2)
+        self._water_brush = QBrush(QColor(51, 153, 255, 180))  # 半透明蓝色
+        self._text_font = QFont("SimHei", 10)
+        self._bottle_pixmap = None
+        self._bottle_key = None
+
+        # 水位动画
+        self.displayed_water = 0.0
+        self._animation_from = 0.0
+        self._animation_start = 0.0
+        self._last_frame = None
+        self._frame_timer = QTimer(self)
+        self._frame_timer.setTimerType(Qt.PreciseTimer)
+        self._frame_timer.setInterval(FRAME_INTERVAL_MS)
+        self._frame_timer.timeout.connect(self.on_frame)
+
+        # 帧统计
+        self.frames = 0
+        self.dropped_frames = 0
+        self.paints = 0
+        self._paint_seconds = 0.0
+        self._max_paint_seconds = 0.0
+
+    def set_values(self, current_water, daily_limit, animate=True):
+        if current_water == self.current_water and daily_limit == self.daily_limit:
+            return
+        self.current_water = current_water
+        self.daily_limit = daily_limit
+        if animate and self.isVisible() and self.displayed_water != current_water:
+            self._animation_from = self.displayed_water
+            self._animation_start = time.perf_counter()
+            self._last_frame = None
+            self._frame_timer.start()
+        else:
+            self.stop_animation()
+        self.update()  # 触发重绘
+
+    def stop_animation(self):
+        """停止动画并直接显示目标水位"""
+        self._frame_timer.stop()
+        self.displayed_water = float(self.current_water)
+
+    def on_frame(self):
+        now = time.perf_counter()
+        # 两帧间隔超出预算的部分按整帧计为掉帧
+        if self._last_frame is not None:
+            late_ms = (now - self._last_frame) * 1000 - FRAME_INTERVAL_MS
+            if late_ms >= FRAME_INTERVAL_MS:
+                self.count_dropped(int(late_ms // FRAME_INTERVAL_MS))
+        self._last_frame = now
+        self.frames += 1
+
+        # 按实际经过的时间插值(ease-out)，掉帧时动画不会被拖长
+        progress = min((now - self._animation_start) * 1000 / ANIMATION_MS, 1.0)
+        eased = 1 - (1 - progress) ** 3
+        self.displayed_water = self._animation_from + (self.current_water - self._animation_from) * eased
+        if progress >= 1.0:
+            self._frame_timer.stop()
+        self.update()
+
+    def count_dropped(self, frames):
+        """掉帧同时计入 dropped_frames_total 计数器，随 paint_seconds 一起出现在性能数据导出中"""
+        self.dropped_frames += frames
+        metrics.count('dropped_frames_total', frames, widget='water_bottle')
+
+    def is_animating(self):
+        return self._frame_timer.isActive()
+
+    def frame_stats(self):
+        """动画帧统计：帧数、掉帧数、绘制次数、平均/最大绘制耗时(毫秒)"""
+        return {
+            'frames': self.frames,
+            'dropped_frames': self.dropped_frames,
+            'paints': self.paints,
+            'avg_paint_ms': self._paint_seconds * 1000 / self.paints if self.paints else 0.0,
+            'max_paint_ms': self._max_paint_seconds * 1000,
+            'animating': self.is_animating(),
+        }
+
+    def hideEvent(self, event):
+        # 窗口最小化到托盘时停止帧定时器，隐藏期间不占用CPU
+        self.stop_animation()
+        super().hideEvent(event)
+
+    def bottle_rect(self):
+        """瓶身所在的矩形"""
+        width = self.width()
+        height = self.height()
+        bottle_width = width * 0.6
+        bottle_height = height * 0.8
+        return QRectF((width - bottle_width) / 2, height * 0.1, bottle_width, bottle_height)
+
+    def resizeEvent(self, event):
+        # 尺寸变化后重新生成瓶身缓存
+        self._bottle_pixmap = None
+        super().resizeEvent(event)
+
+    def bottle_pixmap(self):
+        """返回当前尺寸和设备像素比下的瓶身缓存图"""
+        ratio = self.devicePixelRatioF()
+        key = (self.width(), self.height(), ratio)
+        if self._bottle_pixmap is not None and self._bottle_key == key:
+            return self._bottle_pixmap
+
+        pixmap = QPixmap(round(self.width() * ratio), round(self.height() * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.transparent)
+
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(self._outline_pen)
+
+        # 绘制水瓶轮廓
+        bottle = self.bottle_rect()
+        painter.drawRoundedRect(bottle, 10, 10)
+
+        # 绘制水瓶瓶颈
+        neck_width = bottle.width() * 0.4
+        neck_height = self.height() * 0.1
+        painter.drawRect(QRectF((self.width() - neck_width) / 2, bottle.y() - neck_height, neck_width, neck_height))
+        painter.end()
+
+        self._bottle_pixmap = pixmap
+        self._bottle_key = key
+        return pixmap
+
+    def paintEvent(self, event):
+        started = time.perf_counter()
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.drawPixmap(0, 0, self.bottle_pixmap())
+
+        # 计算水量高度
+        bottle = self.bottle_rect()
+        water_percentage = min(self.displayed_water / self.daily_limit, 1.0)
+        water_height = bottle.height() * water_percentage
+        water_y = bottle.y() + bottle.height() - water_height
+
+        # 绘制水
+        painter.setPen(self._outline_pen)
+        painter.setBrush(self._water_brush)
+        painter.drawRoundedRect(QRectF(bottle.x() + 2, water_y, bottle.width() - 4, water_height - 2), 8, 8)
+
+        # 绘制水量文本
+        painter.setFont(self._text_font)
+        water_text = f"{round(self.displayed_water)}ml / {self.daily_limit}ml"
+        painter.drawText(0, self.height() - 20, self.width(), 20, Qt.AlignCenter, water_text)
+        painter.end()
+
+        elapsed = time.perf_counter() - started
+        self.paints += 1
+        self._paint_seconds += elapsed
+        self._max_paint_seconds = max(self._max_paint_seconds, elapsed)
+        # 绘制过慢造成的掉帧会表现为下一次帧定时器迟到，只在 on_frame 中按帧间隔计数，这里不重复计算
+        metrics.observe('paint_seconds', elapsed, widget='water_bottle')